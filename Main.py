@@ -1,29 +1,32 @@
+import time
+startup_began = time.perf_counter()
+
 import sys
 import os
-import re
 
 # Add back-end to path
 sys.path.append(os.path.join(os.path.dirname(__file__), "back-end"))
 
-from Model import FirstLayerDMM
-from Chatbot import ChatBot
-from RealtimeSearchEngine import RealtimeSearchEngine
-from trend_engine import trend_engine
-from Image_Analyzer import analyze_image
-from ImageGenration import GenerateImages
-from dotenv import dotenv_values
+import config
+from registry import engines
+from dispatcher import is_exit
+from speculation import speculator
 
-env_vars = dotenv_values(".env")
-assistant_name = env_vars.get("Assistant_name", "BELLE")
+assistant_name = config.get("Assistant_name", "BELLE")
 
 print(f"\n===== {assistant_name}.AI Online =====\n")
 
-def clean_query(task, prefix):
-    """Cleans the task string by removing the prefix and any parentheses."""
-    query = task.replace(prefix, "", 1).strip()
-    # Remove parentheses if they wrap the query (e.g., "( query )")
-    query = re.sub(r'^\(\s*(.*?)\s*\)$', r'\1', query)
-    return query.strip()
+if "--serve" in sys.argv:
+    # HTTP + SSE for many users instead of this console (see back-end/server.py)
+    from server import serve
+    serve()
+    sys.exit()
+
+if "--startup-report" in sys.argv:
+    print(f"[STARTUP] Ready in {(time.perf_counter() - startup_began) * 1000:.1f} ms")
+    print("[STARTUP] Loading every engine to measure its import cost...")
+    engines.preload()
+    print(engines.report() + "\n")
 
 while True:
     try:
@@ -37,95 +40,36 @@ while True:
             print(f"\n{assistant_name}: Take care. I'm always here for you 🌸")
             break
 
-        # Step 1 — Decision Model (Classify query into tasks)
-        tasks = FirstLayerDMM(user_input)
-
-        if not tasks:
-            # Fallback to general chat if no task is detected
-            print(f"\n{assistant_name}:\n{ChatBot(user_input)}\n")
+        # a slash command, so a chat message can never trigger it
+        if user_input.lower() == "/stats":
+            from Model import dmm_cache, local_classifier
+            print(f"\n[DMM CACHE] {dmm_cache.stats()}")
+            print(f"[CLASSIFIER] {local_classifier.report()}")
+            print(f"[SPECULATION] {speculator.report()}\n")
             continue
 
-        final_response = ""
-        already_handled = False
-
-        # Step 2 — Execute tasks
-        for task in tasks:
-            task = task.lower().strip()
-
-            # ------------------------------
-            # EXIT
-            # ------------------------------
-            if "exit" in task:
-                print(f"\n{assistant_name}: Take care. I'm always here for you 🌸")
-                sys.exit()
-
-            # ------------------------------
-            # GENERAL CHAT
-            # ------------------------------
-            elif task.startswith("general"):
-                query = clean_query(task, "general")
-                final_response += ChatBot(query) + "\n"
-                already_handled = True
-
-            # ------------------------------
-            # REALTIME SEARCH
-            # ------------------------------
-            elif task.startswith("realtime"):
-                query = clean_query(task, "realtime")
-                final_response += RealtimeSearchEngine(query) + "\n"
-                already_handled = True
-
-            # ------------------------------
-            # TREND ENGINE
-            # ------------------------------
-            elif task.startswith("trend"):
-                query = clean_query(task, "trend")
-                final_response += trend_engine(query) + "\n"
-                already_handled = True
-
-            # ------------------------------
-            # IMAGE GENERATION
-            # ------------------------------
-            elif task.startswith("generate image"):
-                query = clean_query(task, "generate image")
-                GenerateImages(query)
-                final_response += f"I've generated the images for '{query}'. 🎨\n"
-                already_handled = True
-
-            # ------------------------------
-            # IMAGE ANALYZER
-            # ------------------------------
-            elif "image" in task:
-                try:
-                    # For image analysis, we use the cleaned prompt if possible
-                    print(f"\n[INFO] Opening image selection dialog...")
-                    result = analyze_image(user_input) 
-                    final_response += result + "\n"
-                    already_handled = True
-                except Exception as e:
-                    final_response += f"Image analysis failed: {str(e)}\n"
-
-            # ------------------------------
-            # AUTOMATION (Placeholders/Fallback)
-            # ------------------------------
-            elif any(task.startswith(func) for func in ["open", "close", "play", "system", "content", "google search", "youtube search", "reminder"]):
-                # Handle these intents if they are detected but not implemented yet
-                query = task.strip()
-                # For now, we still use ChatBot to respond to these requests
-                if not already_handled:
-                    final_response += ChatBot(user_input) + "\n"
-                    already_handled = True
-                else:
-                    final_response += f"(Detected intent: {task} - Not fully implemented yet)\n"
-
-        # Step 3 — Final Output
-        if final_response:
-            print(f"\n{assistant_name}:\n")
-            print(final_response.strip())
-            print()
-        elif not already_handled:
-            # Final fallback if nothing was processed
-            print(f"\n{assistant_name}:\n{ChatBot(user_input)}\n")
+        # Step 1 — Decision Model (Classify query into tasks)
+        # (an empty task list falls back to general chat in plan_tasks;
+        # with speculative_chat=true the chat answer starts alongside it)
+        tasks, chunks = speculator.run_turn(user_input)
+
+        # ------------------------------
+        # EXIT
+        # ------------------------------
+        if is_exit(tasks):
+            print(f"\n{assistant_name}: Take care. I'm always here for you 🌸")
+            sys.exit()
+
+        # Step 2 — Execute tasks (concurrently, responses kept in task order)
+        # Step 3 — Stream the output as it arrives
+        print(f"\n{assistant_name}:\n")
+        current = None
+        for index, chunk in chunks:
+            if current is not None and index != current:
+                print()
+            current = index
+            print(chunk, end="", flush=True)
+        print("\n")
 
     except KeyboardInterrupt:
         print(f"\n\n{assistant_name}: Goodbye!")
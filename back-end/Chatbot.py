@@ -1,20 +1,15 @@
 from groq import Groq
-from json import load, dump
-from dotenv import dotenv_values
-import os
+import config
+from conversation_store import get_store
+from context_window import get_context_builder, count_tokens
 
-# ================== PATH SETUP ==================
-script_dir = os.path.dirname(os.path.abspath(__file__))
-env_path = os.path.join(script_dir, "..", ".env")
-
-env_vars = dotenv_values(env_path)
-
-username = env_vars.get("username", "User")
-assistant_name = env_vars.get("Assistant_name", "HIRA")
-groq_api_key = env_vars.get("groq_api_key")
+# ================== CONFIG ==================
+username = config.get("username", "User")
+assistant_name = config.get("Assistant_name", "HIRA")
+groq_api_key = config.get("groq_api_key")
 
 if not groq_api_key:
-    raise RuntimeError("groq_api_key missing in .env file")
+    raise RuntimeError(f"groq_api_key missing in {config.ENV_PATH}")
 
 # ================== INIT CLIENT ==================
 client = Groq(api_key=groq_api_key)
@@ -35,58 +30,54 @@ systemChatbot = [
     {"role": "system", "content": SYSTEM_PROMPT}
 ]
 
-# ================== CHAT MEMORY ==================
-DATA_DIR = "Data"
-CHATLOG_PATH = os.path.join(DATA_DIR, "ChatLog.json")
-
-if not os.path.exists(DATA_DIR):
-    os.makedirs(DATA_DIR)
-
-try:
-    with open(CHATLOG_PATH, "r") as f:
-        messages = load(f)
-except (FileNotFoundError, ValueError):
-    messages = []
-    with open(CHATLOG_PATH, "w") as f:
-        dump(messages, f, indent=4)
-
 # ================== HELPERS ==================
 def AnswerModifier(answer: str) -> str:
     return "\n".join(line for line in answer.split("\n") if line.strip())
 
 # ================== CORE CHATBOT ==================
-def ChatBot(query: str) -> str:
-    global messages
-
+def ChatBotStream(query: str, save: bool = True):
+    """
+    Yields answer tokens as Groq streams them; the chat log is saved at the
+    end. With save=False the caller decides: the finished answer is the
+    generator's return value (None on error) and nothing is logged.
+    """
+    # the caller's session history, or the shared one (see conversation_store.py)
+    store = get_store()
+    context = get_context_builder(client)
     try:
-        messages.append({"role": "user", "content": query})
+        history = context.build(query, reserved_tokens=count_tokens(SYSTEM_PROMPT + query))
 
         completion = client.chat.completions.create(
             model="llama-3.1-8b-instant",
-            messages=systemChatbot + messages,
+            messages=systemChatbot + history + [{"role": "user", "content": query}],
             temperature=0.7,
             max_tokens=1000,
             stream=True
         )
 
         answer = ""
-        for chunk in completion:
-            delta = chunk.choices[0].delta
-            if delta and delta.content:
-                answer += delta.content
-
-        answer = answer.replace("</s>", "").strip()
-
-        messages.append({"role": "assistant", "content": answer})
-
-        with open(CHATLOG_PATH, "w") as f:
-            dump(messages, f, indent=4)
-
-        return AnswerModifier(answer)
+        try:
+            for chunk in completion:
+                delta = chunk.choices[0].delta
+                if delta and delta.content:
+                    token = delta.content.replace("</s>", "")
+                    answer += token
+                    yield token
+        finally:
+            # stop the HTTP stream too when the caller abandons us mid-answer
+            if hasattr(completion, "close"):
+                completion.close()
+
+        if save:
+            store.append_turn(query, answer.strip())
+        return answer.strip()
 
     except Exception as e:
         print(f"[ERROR] {e}")
-        return "Something went wrong. Please try again."
+        yield "Something went wrong. Please try again."
+
+def ChatBot(query: str) -> str:
+    return AnswerModifier("".join(ChatBotStream(query)).strip())
 
 # ================== RUN ==================
 if __name__ == "__main__":
@@ -1,102 +1,222 @@
 import asyncio
 import os
+import random
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from random import randint
-from PIL import Image
-from dotenv import get_key
+import config
+from image_postprocess import build_previews, process_results, preview_async
+from image_store import get_store
+from image_jobs import ImageJobQueue, POLL_INTERVAL
 from time import sleep
 
 # Get the directory of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
-env_path = os.path.abspath(os.path.join(script_dir, "..", ".env"))
 
-def open_images(prompt):
-    folder_path = os.path.join(script_dir, "Data")
-    prompt_clean = prompt.replace(" ", "_")
+# How many variants per prompt, how many requests in flight, and how hard to retry
+IMAGE_VARIANTS = int(config.get("image_variants", 4))
+IMAGE_CONCURRENCY = int(config.get("image_concurrency", 4))
+IMAGE_TIMEOUT = float(config.get("image_timeout", 90))
+IMAGE_RETRIES = int(config.get("image_retries", 4))
+# Render on the CPU with image_engine when the API gives us nothing
+IMAGE_LOCAL_FALLBACK = config.get("image_local_fallback", "true").lower() == "true"
 
-    for i in range(1, 5):
-        jpg_file = f"{prompt_clean}_{i}.jpg"
-        image_path = os.path.join(folder_path, jpg_file)
-        try:
-            img = Image.open(image_path)
-            print(f"Opening image: {image_path}")
-            img.show()
-            sleep(1) # Small delay to let the default viewer open
-        except IOError:
-            print(f"Error opening image: {image_path}")
+def open_images(result):
+    """Previews the batch as one contact sheet, in the background."""
+    path = result.get("contact_sheet")
+    if path:
+        print(f"Opening image: {path}")
+        preview_async(path)
+    else:
+        print("No images to preview.")
 
 API_URL = "https://router.huggingface.co/hf-inference/models/stabilityai/stable-diffusion-xl-base-1.0"
 
-# Using absolute path for .env file
-hf_token = get_key(env_path, "Hugging_Face_api")
+hf_token = config.get("Hugging_Face_api")
 Header = {"Authorization": f"Bearer {hf_token}"}
 
-async def query(payload):
-    response = requests.post(API_URL, headers=Header, json=payload)
-    if response.status_code == 200:
-        return response.content
-    else:
-        print(f"[ERROR] API returned status code {response.status_code}: {response.text}")
-        return None
+# One pooled keep-alive session shared by every request
+session = None
+session_lock = threading.Lock()
+
+def get_session():
+    global session
+    with session_lock:
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=IMAGE_CONCURRENCY, pool_maxsize=IMAGE_CONCURRENCY)
+            session.mount("https://", adapter)
+            session.headers.update(Header)
+        return session
+
+def backoff_delay(attempt, response=None):
+    """Exponential backoff with jitter; a 503 'model loading' says how long to wait."""
+    delay = min(2 ** attempt, 30)
+    if response is not None:
+        try:
+            delay = min(float(response.json().get("estimated_time", delay)), 60)
+        except (ValueError, AttributeError):
+            pass
+    return delay + random.uniform(0, 1)
+
+async def query(payload, semaphore=None):
+    # requests is blocking: run it on a worker thread so the variants overlap
+    semaphore = semaphore or asyncio.Semaphore(1)
+
+    async with semaphore:
+        for attempt in range(IMAGE_RETRIES + 1):
+            try:
+                response = await asyncio.to_thread(
+                    get_session().post, API_URL, json=payload, timeout=IMAGE_TIMEOUT
+                )
+            except requests.RequestException as e:
+                if attempt == IMAGE_RETRIES:
+                    print(f"[ERROR] Image request failed: {e}")
+                    return None
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            if response.status_code == 200:
+                return response.content
+
+            if response.status_code in (429, 503) and attempt < IMAGE_RETRIES:
+                delay = backoff_delay(attempt, response)
+                print(f"[INFO] Model busy ({response.status_code}), retrying in {delay:.0f}s...")
+                await asyncio.sleep(delay)
+                continue
+
+            print(f"[ERROR] API returned status code {response.status_code}: {response.text}")
+            return None
+
+def local_fallback(prompt, variants):
+    """Offline variants from the local pipeline, or [] if it is not installed."""
+    try:
+        from image_engine import generate_images_local
+    except ImportError as e:
+        print(f"[ERROR] Local image fallback unavailable: {e}")
+        return []
+    print(f"[INFO] Image API unavailable; rendering {variants} image(s) locally...")
+    try:
+        return generate_images_local(prompt, variants)
+    except ImportError as e:
+        print(f"[ERROR] Local image fallback unavailable: {e}")
+    except Exception as e:
+        print(f"[ERROR] Local image generation failed: {e}")
+    return []
+
+async def generate_images(prompt: str, variants: int = IMAGE_VARIANTS, on_progress=None, fresh=False):
+    """
+    Generates the variants concurrently. Images already stored for this
+    prompt are reused unless fresh=True, so only the shortfall hits the API.
+    Returns {"images", "thumbnails", "contact_sheet"} with the saved paths.
+    """
+    store = get_store()
+    cached = [] if fresh else await asyncio.to_thread(store.lookup, prompt, variants)
+    existing = [(entry["digest"], entry["path"]) for entry in cached]
+    missing = variants - len(existing)
+
+    if missing <= 0:
+        print(f"[INFO] Serving {len(existing)} stored image(s) for: {prompt}")
+        if on_progress:
+            on_progress(1.0)
+        return await asyncio.to_thread(build_previews, store, existing)
 
-async def generate_images(prompt: str):
     tasks = []
-    prompt_clean = prompt.replace(' ', '_')
-    data_dir = os.path.join(script_dir, "Data")
-    
-    if not os.path.exists(data_dir):
-        os.makedirs(data_dir)
+    seeds = []
+    finished = []
+    semaphore = asyncio.Semaphore(IMAGE_CONCURRENCY)
 
-    for _ in range(4):
+    for _ in range(missing):
+        seed = randint(0, 1_000_000)
         payload = {
             "inputs": (
                 f"{prompt}, quality=4K, sharpness=maximum, "
                 f"Ultra High details, high resolution, "
-                f"seed={randint(0, 1_000_000)}"
+                f"seed={seed}"
             )
         }
-        task = asyncio.create_task(query(payload))
+        task = asyncio.create_task(query(payload, semaphore))
+        if on_progress:
+            task.add_done_callback(lambda t: (finished.append(t), on_progress(len(finished) / missing)))
         tasks.append(task)
+        seeds.append(seed)
 
     image_bytes_list = await asyncio.gather(*tasks)
 
-    for i, image_bytes in enumerate(image_bytes_list):
-        if image_bytes:
-            file_path = os.path.join(data_dir, f"{prompt_clean}_{i + 1}.jpg")
-            with open(file_path, "wb") as f:
-                f.write(image_bytes)
-            print(f"[SUCCESS] Saved: {file_path}")
+    results = [(seed, image_bytes) for seed, image_bytes in zip(seeds, image_bytes_list) if image_bytes]
+    if not results and IMAGE_LOCAL_FALLBACK:
+        results = await asyncio.to_thread(local_fallback, prompt, missing)
 
-def GenerateImages(prompt: str):
-    asyncio.run(generate_images(prompt))
-    open_images(prompt)
+    # decoding + thumbnails are CPU work; keep them off the event loop
+    saved = await asyncio.to_thread(process_results, results, store, prompt, existing)
+    for path in saved["images"]:
+        print(f"[SUCCESS] Saved: {path}")
+
+    await asyncio.to_thread(store.evict)
+    return saved
+
+def GenerateImages(prompt: str, variants: int = IMAGE_VARIANTS, preview: bool = True):
+    """preview=False (e.g. the server) only returns the paths; no viewer is opened here."""
+    result = asyncio.run(generate_images(prompt, variants))
+    if preview:
+        open_images(result)
+    return result
+
+def generate_for_job(prompt, progress):
+    """image_jobs worker entry point: no preview windows, just the files."""
+    saved = asyncio.run(generate_images(prompt, on_progress=progress))
+    if not saved["images"]:
+        raise RuntimeError("No images were generated.")
+    return saved
 
 # Correct path for the data file used by front-end
 data_file_path = os.path.abspath(os.path.join(script_dir, "..", "Frontend", "Files", "ImageGeneration.data"))
 
-if __name__ == "__main__":
-    print(f"[INFO] Monitoring {data_file_path}...")
+def watch_legacy_file(jobs):
+    """
+    Bridges the old 'prompt,True' ImageGeneration.data handshake into the job
+    queue. Only the file's mtime is polled, so new requests are seen within
+    POLL_INTERVAL and never lost while another job is running.
+    """
+    last_mtime = None
     while True:
         try:
-            if os.path.exists(data_file_path):
-                with open(data_file_path, "r") as f:
-                    content = f.read().strip()
-                
-                if content:
-                    parts = content.split(",")
-                    if len(parts) == 2:
-                        prompt, status = parts
-                        
-                        if status.strip().lower() == "true":
-                            print(f"[PROCESS] Generating images for: {prompt}")
-                            GenerateImages(prompt=prompt.strip())
-
-                            with open(data_file_path, "w") as f:
-                                f.write("False,False")
-                            print("[INFO] Image generation complete and status reset.")
-                            # break # Optional: remove if you want it to keep running
-                    
-            sleep(1)
-        except Exception as e:
-            print(f"[ERROR] {e}")
-            sleep(1)
+            mtime = os.stat(data_file_path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime is not None and mtime != last_mtime:
+            last_mtime = mtime
+            with open(data_file_path, "r") as f:
+                content = f.read().strip()
+
+            parts = content.split(",")
+            if len(parts) == 2 and parts[1].strip().lower() == "true":
+                job_id = jobs.submit(parts[0].strip())
+                print(f"[INFO] Queued job {job_id} for: {parts[0].strip()}")
+
+                with open(data_file_path, "w") as f:
+                    f.write("False,False")
+                last_mtime = os.stat(data_file_path).st_mtime
+
+        sleep(POLL_INTERVAL)
+
+if __name__ == "__main__":
+    import sys
+
+    jobs = ImageJobQueue(generate_for_job, workers=int(config.get("image_workers", 2)))
+
+    if len(sys.argv) > 2 and sys.argv[1] == "submit":
+        print(jobs.submit(" ".join(sys.argv[2:])))
+    elif len(sys.argv) > 2 and sys.argv[1] == "status":
+        print(jobs.status(sys.argv[2]))
+    elif len(sys.argv) > 1 and sys.argv[1] == "store":
+        print(get_store().stats())
+    else:
+        jobs.start()
+        print(f"[INFO] Image job workers running; monitoring {data_file_path}...")
+        try:
+            watch_legacy_file(jobs)
+        except KeyboardInterrupt:
+            jobs.stop()
@@ -4,47 +4,41 @@
 import os
 import base64
 import mimetypes
-import cv2
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 import cohere
-from dotenv import load_dotenv
+import config
+from camera_capture import CameraCapture, capture_best, frame_dhash
+from image_preprocess import prepare_image
+from vision_cache import VisionCache, dhash, hamming
 from tkinter import Tk, filedialog
 
 # -----------------------------
 # LOAD ENV
 # -----------------------------
-load_dotenv()
+COHERE_API_KEY = config.get("COHERE_API_KEY")
+# No preview window: let the camera settle, then take the best frame
+CAMERA_HEADLESS = config.get("camera_headless", "false").lower() == "true"
 
-COHERE_API_KEY = os.getenv("COHERE_API_KEY")
+# Mirror mode: how often to look, how different the scene must be, and the call rate cap
+MIRROR_SAMPLE_INTERVAL = float(config.get("mirror_sample_interval", 1.0))
+MIRROR_CHANGE_THRESHOLD = int(config.get("mirror_change_threshold", 12))
+MIRROR_MIN_INTERVAL = float(config.get("mirror_min_interval", 10))
 
 # Initialize Cohere Client
 # Using c4ai-aya-vision-8b for BELLE Aya Vision
 client = cohere.ClientV2(api_key=COHERE_API_KEY)
 
+# Re-analysing the same (or a near-identical) photo with the same prompt is answered from here
+vision_cache = VisionCache()
+
 # -----------------------------
 # CAMERA CAPTURE
 # -----------------------------
-def capture_from_camera(save_path="captured.jpg"):
-    cap = cv2.VideoCapture(0)
-
-    print("Camera started. Press SPACE to capture.")
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("Camera error.")
-            break
-
-        cv2.imshow("BELLE Camera", frame)
-
-        # SPACE key
-        if cv2.waitKey(1) & 0xFF == 32:
-            cv2.imwrite(save_path, frame)
-            print(f"Saved image: {save_path}")
-            break
-
-    cap.release()
-    cv2.destroyAllWindows()
-    return save_path
+def capture_from_camera(save_path="captured.jpg", headless=CAMERA_HEADLESS):
+    # frames are read on a background thread; the sharpest recent one is kept
+    return capture_best(save_path, headless=headless)
 
 
 # -----------------------------
@@ -70,11 +64,22 @@ def upload_from_pc():
 # CONVERT IMAGE TO BASE64
 # -----------------------------
 def encode_image(image_path):
-    mime = mimetypes.guess_type(image_path)[0] or "image/jpeg"
-
-    with open(image_path, "rb") as f:
-        encoded = base64.b64encode(f.read()).decode()
+    try:
+        # upright, smaller and recompressed: far less to upload and for the model to read
+        data, mime, stats = prepare_image(image_path)
+        saved = stats["saved_bytes"]
+        print(
+            f"[INFO] Image {stats['original_size'][0]}x{stats['original_size'][1]} -> "
+            f"{stats['size'][0]}x{stats['size'][1]}, {stats['original_bytes'] / 1024:.0f} KB -> "
+            f"{stats['bytes'] / 1024:.0f} KB ({saved / max(stats['original_bytes'], 1):.0%} saved)"
+        )
+    except Exception as e:
+        print(f"[ERROR] Pre-processing failed, sending the original: {e}")
+        mime = mimetypes.guess_type(image_path)[0] or "image/jpeg"
+        with open(image_path, "rb") as f:
+            data = f.read()
 
+    encoded = base64.b64encode(data).decode()
     return f"data:{mime};base64,{encoded}"
 
 
@@ -82,6 +87,18 @@ def encode_image(image_path):
 # AYA VISION ANALYZER
 # -----------------------------
 def analyze_with_aya(prompt, image_path):
+    try:
+        image_hash = dhash(image_path)
+    except Exception as e:
+        print(f"[ERROR] Could not hash image: {e}")
+        image_hash = None
+
+    if image_hash is not None:
+        cached = vision_cache.get(image_hash, prompt)
+        if cached is not None:
+            print("[INFO] Answered from the vision cache.")
+            return cached
+
     print("Sending image to Aya Vision via Cohere...")
 
     data_url = encode_image(image_path)
@@ -99,10 +116,96 @@ def analyze_with_aya(prompt, image_path):
                 }
             ]
         )
-        return response.message.content[0].text
+        answer = response.message.content[0].text
     except Exception as e:
         return f"Error analyzing image: {str(e)}"
 
+    if image_hash is not None:
+        vision_cache.set(image_hash, prompt, answer)
+    return answer
+
+
+# -----------------------------
+# MIRROR MODE
+# -----------------------------
+def mirror_mode(prompt, on_result=print, headless=CAMERA_HEADLESS, duration=None,
+                sample_interval=MIRROR_SAMPLE_INTERVAL, threshold=MIRROR_CHANGE_THRESHOLD,
+                min_interval=MIRROR_MIN_INTERVAL):
+    """
+    Live feedback: samples the camera every `sample_interval` seconds and
+    sends a frame to Aya Vision only when its hash is `threshold` bits away
+    from the last one sent, at most once per `min_interval` seconds and with
+    one request in flight. The capture loop never waits on a request.
+    Stops on 'q'/ESC, Ctrl+C or after `duration` seconds; returns the stats.
+    """
+    import cv2
+
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="belle-mirror")
+    in_flight = None
+    last_hash = None
+    last_call = float("-inf")
+    next_sample = 0.0
+    stats = {"samples": 0, "unchanged": 0, "deferred": 0, "calls": 0}
+    started = time.monotonic()
+    frame_dir = tempfile.mkdtemp(prefix="belle-mirror-")
+
+    def analyze(path):
+        try:
+            on_result(analyze_with_aya(prompt, path))
+        finally:
+            os.remove(path)
+
+    if not headless:
+        print("Mirror mode started. Press Q or ESC to stop.")
+    try:
+        with CameraCapture() as camera:
+            while camera.error is None:
+                if duration is not None and time.monotonic() - started >= duration:
+                    break
+
+                if not headless:
+                    frame = camera.latest()
+                    if frame is not None:
+                        cv2.imshow("BELLE Mirror", frame)
+                    if cv2.waitKey(15) & 0xFF in (ord("q"), 27):
+                        break
+                else:
+                    time.sleep(0.05)
+
+                now = time.monotonic()
+                if now < next_sample:
+                    continue
+                next_sample = now + sample_interval
+
+                frame, _ = camera.best_frame(sample_interval)
+                if frame is None:
+                    continue
+                stats["samples"] += 1
+
+                frame_hash = frame_dhash(frame)
+                if last_hash is not None and hamming(frame_hash, last_hash) < threshold:
+                    stats["unchanged"] += 1
+                    continue
+                if (in_flight is not None and not in_flight.done()) or now - last_call < min_interval:
+                    # changed, but try again on a later sample
+                    stats["deferred"] += 1
+                    continue
+
+                path = os.path.join(frame_dir, f"frame_{stats['calls']}.jpg")
+                cv2.imwrite(path, frame)
+                in_flight = executor.submit(analyze, path)
+                last_hash, last_call = frame_hash, now
+                stats["calls"] += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if not headless:
+            cv2.destroyAllWindows()
+        executor.shutdown(wait=True)
+
+    stats["seconds"] = time.monotonic() - started
+    return stats
+
 
 # -----------------------------
 # MAIN ANALYZER
@@ -112,8 +215,15 @@ def analyze_image(prompt, source="upload"):
     BELLE.AI Aya Vision Analyzer
     """
 
-    if source == "cam":
+    if source == "mirror":
+        answers = []
+        stats = mirror_mode(prompt, on_result=lambda answer: (answers.append(answer), print(f"\n{answer}\n")))
+        print(f"[INFO] Mirror mode: {stats}")
+        return answers[-1] if answers else "No changes worth analysing were seen."
+    elif source == "cam":
         image_path = capture_from_camera()
+    elif source == "cam-headless":
+        image_path = capture_from_camera(headless=True)
     else:
         image_path = upload_from_pc()
 
@@ -125,7 +235,7 @@ def analyze_image(prompt, source="upload"):
 # -----------------------------
 if __name__ == "__main__":
     print("--- BELLE.AI Aya Vision Analyzer ---")
-    mode = input("Type 'cam' or 'upload': ").strip().lower()
+    mode = input("Type 'cam', 'cam-headless', 'mirror' or 'upload': ").strip().lower()
     user_prompt = input("Enter your prompt: ").strip()
 
     if not user_prompt:
@@ -134,5 +244,6 @@ if __name__ == "__main__":
     try:
         result = analyze_image(user_prompt, source=mode)
         print("\nBELLE.AI says:\n", result)
+        print(f"\nVision cache: {vision_cache.stats()}")
     except Exception as e:
         print(f"An error occurred: {e}")
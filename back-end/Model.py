@@ -1,21 +1,28 @@
-import cohere
 from rich import print
 import os
-from dotenv import dotenv_values
-
-# Get the directory of the current script
-script_dir = os.path.dirname(os.path.abspath(__file__))
-env_path = os.path.join(script_dir, "..", ".env")
+import threading
+import config
+from intent_classifier import IntentClassifier, normalize_prompt
+from ttl_cache import TTLCache, DATA_DIR
 
 # Load env
-env_vars = dotenv_values(env_path)
-cohereAPIKey = env_vars.get("COHERE_API_KEY")
+cohereAPIKey = config.get("COHERE_API_KEY")
 if not cohereAPIKey:
     raise RuntimeError("COHERE_API_KEY not found. Check .env file.")
 
 
-# Cohere client
-co = cohere.Client(cohereAPIKey)
+# Cohere client: built on the first remote call, so turns answered by the
+# cache or the local classifier never import the SDK
+co = None
+co_lock = threading.Lock()
+
+def get_cohere_client():
+    global co
+    with co_lock:
+        if co is None:
+            import cohere
+            co = cohere.Client(cohereAPIKey)
+        return co
 
 # Supported intents
 funcs = [
@@ -69,11 +76,18 @@ ChatHistory = [
     {"role": "Chatbot", "message": "general chat with me."}
 ]
 
-def FirstLayerDMM(prompt: str):
-    if not prompt.strip():
-        return []
+# Local fast path: rules + a model trained on logged DMM answers
+local_classifier = IntentClassifier()
 
-    stream = co.chat_stream(
+# Remote answers for repeated phrasings, keyed on the normalized prompt
+dmm_cache = TTLCache(
+    path=os.path.join(DATA_DIR, "DMMCache.json"),
+    max_entries=2000,
+    ttl=7 * 24 * 3600
+)
+
+def RemoteDMM(prompt: str):
+    stream = get_cohere_client().chat_stream(
         model="command-r-08-2024",          # ✅ VALID MODEL
         message=prompt,
         temperature=0.2,
@@ -105,6 +119,35 @@ def FirstLayerDMM(prompt: str):
 
     return filtered
 
+def QuickDMM(prompt: str):
+    """Tasks from the cache or the local classifier; None when only Cohere can tell."""
+    if not prompt.strip():
+        return []
+
+    tasks = dmm_cache.get(normalize_prompt(prompt).rstrip(".!?"))
+    if tasks is not None:
+        return list(tasks)
+
+    tasks = local_classifier.classify(prompt)
+    if tasks is not None:
+        local_classifier.maybe_shadow(prompt, tasks, RemoteDMM)
+    return tasks
+
+
+def RemoteFirstLayerDMM(prompt: str):
+    """The Cohere tier alone, for callers that already tried QuickDMM."""
+    tasks = RemoteDMM(prompt)
+    local_classifier.record(prompt, tasks)
+    dmm_cache.set(normalize_prompt(prompt).rstrip(".!?"), tasks)
+    return tasks
+
+
+def FirstLayerDMM(prompt: str):
+    tasks = QuickDMM(prompt)
+    if tasks is not None:
+        return tasks
+    return RemoteFirstLayerDMM(prompt)
+
 
 if __name__ == "__main__":
     while True:
@@ -114,6 +157,10 @@ if __name__ == "__main__":
             print("[yellow]Please type something.[/yellow]")
             continue
 
+        if user_input == "stats":
+            print({"classifier": local_classifier.report(), "cache": dmm_cache.stats()})
+            continue
+
         result = FirstLayerDMM(user_input)
         print(result)
 
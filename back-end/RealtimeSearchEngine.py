@@ -1,22 +1,23 @@
 from googlesearch import search
 from groq import Groq
-from json import load, dump
 import datetime
-from dotenv import dotenv_values
 import os
-
-# ================== PATH SETUP ==================
-script_dir = os.path.dirname(os.path.abspath(__file__))
-env_path = os.path.join(script_dir, "..", ".env")
-
-env_vars = dotenv_values(env_path)
-
-username = env_vars.get("username", "User")
-assistant_name = env_vars.get("Assistant_name", "HIRA")
-groq_api_key = env_vars.get("groq_api_key")
+import re
+import threading
+import time
+import config
+from ttl_cache import TTLCache
+from web_enrichment import collect_page_texts, start_page_fetches
+from conversation_store import get_store
+from context_window import get_context_builder, count_tokens
+
+# ================== CONFIG ==================
+username = config.get("username", "User")
+assistant_name = config.get("Assistant_name", "HIRA")
+groq_api_key = config.get("groq_api_key")
 
 if not groq_api_key:
-    raise RuntimeError(f"groq_api_key missing in {env_path}")
+    raise RuntimeError(f"groq_api_key missing in {config.ENV_PATH}")
 
 client = Groq(api_key=groq_api_key)
 
@@ -27,39 +28,135 @@ You are an advanced AI assistant named {assistant_name}.
 Respond professionally with clear formatting and accuracy.
 """
 
-# ================== CHAT MEMORY ==================
-chatlog_path = os.path.join(script_dir, "..", "Data", "ChatLog.json")
-
-try:
-    with open(chatlog_path, "r") as f:
-        messages = load(f)
-except (FileNotFoundError, ValueError):
-    messages = []
-    with open(chatlog_path, "w") as f:
-        dump(messages, f)
+# ================== SEARCH CACHE ==================
+# News-like questions go stale in minutes, reference questions in days
+NEWS_PATTERN = re.compile(
+    r"\b(news|today|tonight|latest|breaking|current(ly)?|now|live|score|weather|"
+    r"price|stock|rate|update|this week|yesterday|trending)\b"
+)
+SEARCH_TTL_NEWS = int(config.get("search_ttl_news", 15 * 60))
+SEARCH_TTL_REFERENCE = int(config.get("search_ttl_reference", 7 * 24 * 3600))
+
+search_cache = TTLCache(
+    path=os.path.join(config.DATA_DIR, "SearchCache.json"),
+    max_entries=500
+)
+
+# Optional: fetch the top pages and give the model their text, not just URLs
+SEARCH_ENRICH = config.get("search_enrich", "false").lower() == "true"
+SEARCH_ENRICH_PAGES = int(config.get("search_enrich_pages", 3))
+SEARCH_ENRICH_BUDGET = float(config.get("search_enrich_budget", 1.5))
+# Context kept free for each page's text while the pages are still loading
+SEARCH_PAGE_TOKENS = 400
+
+def normalize_query(query):
+    return " ".join(re.sub(r"[^\w\s]", " ", query.lower()).split())
+
+def search_ttl(query):
+    return SEARCH_TTL_NEWS if NEWS_PATTERN.search(query) else SEARCH_TTL_REFERENCE
 
 # ================== HELPERS ==================
-def google_search_results(query):
+def fetch_search_results(query):
+    # googlesearch-python returns URLs (strings) or result objects
+    results = []
+    for r in search(query, num_results=5):
+        if isinstance(r, str):
+            results.append({"url": r})
+        else:
+            results.append({
+                "url": getattr(r, 'url', str(r)),
+                "title": getattr(r, 'title', 'Search Result'),
+                "description": getattr(r, 'description', 'No description available')
+            })
+    return results
+
+def format_search_results(query, entry):
+    text = f"Search results for: {query}\n\n"
+    pages = entry.get("pages", {})
+    for i, r in enumerate(entry["results"], 1):
+        if "title" in r:
+            text += f"Title: {r['title']}\nDescription: {r['description']}\nURL: {r['url']}\n"
+        else:
+            text += f"Result {i}: {r['url']}\n"
+        page = pages.get(r["url"])
+        if page and page[1]:
+            text += f"Page content: {page[1]}\n"
+        text += "\n"
+    return text
+
+def start_enrich(key, entry):
+    """
+    Starts fetching the top pages and returns finish(), which adds the pages
+    that arrive within SEARCH_ENRICH_BUDGET of now. Late pages are still
+    added and cached, for the next identical question.
+    """
+    urls = [r["url"] for r in entry["results"][:SEARCH_ENRICH_PAGES]]
+    entry["pages"] = {}
+    lock = threading.Lock()
+    started = time.perf_counter()
+
+    def add_page(url, page):
+        # fetch threads add pages concurrently; replaced, not mutated, so a
+        # concurrent cache save never sees it change
+        with lock:
+            entry["pages"] = {**entry["pages"], url: list(page)}
+
+    def store_late_page(url, page):
+        add_page(url, page)
+        search_cache.set(key, entry, ttl=search_ttl(key))
+
+    futures = start_page_fetches(urls)
+
+    def finish():
+        remaining = SEARCH_ENRICH_BUDGET - (time.perf_counter() - started)
+        for url, page in collect_page_texts(futures, remaining, on_late_result=store_late_page).items():
+            add_page(url, page)
+
+    return finish
+
+def start_search(query):
+    """
+    (results text, finish). With search_enrich the page fetches are left
+    running so the caller can build its prompt meanwhile; finish() then
+    returns the text with the pages in. finish is None when nothing is pending.
+    """
+    key = normalize_query(query)
+    entry = search_cache.get(key)
+    if entry is not None:
+        return format_search_results(query, entry), None
+
+    try:
+        results = fetch_search_results(query)
+    except Exception as e:
+        return f"Google Search Error: {str(e)}", None
+    if not results:
+        return "No Google search results found.", None
+
+    entry = {"results": results}
+    if not SEARCH_ENRICH:
+        search_cache.set(key, entry, ttl=search_ttl(key))
+        return format_search_results(query, entry), None
+
     try:
-        # googlesearch-python returns a generator of URLs (strings)
-        results = list(search(query, num_results=5))
-        if not results:
-            return "No Google search results found."
-            
-        text = f"Search results for: {query}\n\n"
-        for i, r in enumerate(results, 1):
-            if isinstance(r, str):
-                # If it's a string, it's a URL
-                text += f"Result {i}: {r}\n"
-            else:
-                # If it's an object with attributes
-                title = getattr(r, 'title', 'Search Result')
-                description = getattr(r, 'description', 'No description available')
-                url = getattr(r, 'url', str(r))
-                text += f"Title: {title}\nDescription: {description}\nURL: {url}\n\n"
-        return text
+        finish_enrich = start_enrich(key, entry)
     except Exception as e:
-        return f"Google Search Error: {str(e)}"
+        print(f"[ERROR] Search enrichment failed: {e}")
+        finish_enrich = None
+
+    def finish():
+        if finish_enrich is not None:
+            try:
+                finish_enrich()
+            except Exception as e:
+                print(f"[ERROR] Search enrichment failed: {e}")
+        search_cache.set(key, entry, ttl=search_ttl(key))
+        return format_search_results(query, entry)
+
+    return format_search_results(query, entry), finish
+
+def google_search_results(query):
+    text, finish = start_search(query)
+    return finish() if finish else text
 
 def clean_answer(answer):
     return "\n".join(line for line in answer.split("\n") if line.strip())
@@ -76,16 +173,26 @@ def realtime_info():
     )
 
 # ================== CORE ENGINE ==================
-def RealtimeSearchEngine(prompt):
-    global messages
+def RealtimeSearchEngineStream(prompt):
+    """Yields answer tokens as Groq streams them; the chat log is saved at the end."""
+    # the caller's session history, or the shared one (see conversation_store.py)
+    store = get_store()
+    context = get_context_builder(client)
+
+    search_context, finish_search = start_search(prompt)
+    reserved_tokens = count_tokens(SYSTEM_PROMPT + search_context + realtime_info() + prompt)
+    if finish_search:
+        # pages are still loading while the history is built; keep room for them
+        reserved_tokens += SEARCH_ENRICH_PAGES * SEARCH_PAGE_TOKENS
+    history = context.build(prompt, reserved_tokens=reserved_tokens)
+    if finish_search:
+        search_context = finish_search()
+    search_context += realtime_info()
 
     conversation = [
         {"role": "system", "content": SYSTEM_PROMPT},
-        *messages,
-        {
-            "role": "system",
-            "content": google_search_results(prompt) + realtime_info()
-        },
+        *history,
+        {"role": "system", "content": search_context},
         {"role": "user", "content": prompt}
     ]
 
@@ -103,16 +210,12 @@ def RealtimeSearchEngine(prompt):
         delta = chunk.choices[0].delta
         if delta and delta.content:
             answer += delta.content
+            yield delta.content
 
-    answer = answer.strip()
-
-    messages.append({"role": "user", "content": prompt})
-    messages.append({"role": "assistant", "content": answer})
+    store.append_turn(prompt, answer.strip())
 
-    with open(chatlog_path, "w") as f:
-        dump(messages, f, indent=4)
-
-    return clean_answer(answer)
+def RealtimeSearchEngine(prompt):
+    return clean_answer("".join(RealtimeSearchEngineStream(prompt)).strip())
 
 # ================== RUN ==================
 if __name__ == "__main__":
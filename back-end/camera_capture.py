@@ -0,0 +1,164 @@
+# ==========================================
+# BELLE.AI Camera Capture
+# Background reader thread, frame ring buffer, sharpest-frame selection
+# ==========================================
+
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from image_preprocess import get_face_detector
+
+# Frames scored when picking the best shot (the most recent ones)
+SELECTION_WINDOW = 1.0
+# How many of the sharpest candidates get the (slower) face check
+FACE_CANDIDATES = 5
+# A frame with a face beats a sharper one without by this factor
+FACE_BONUS = 1.5
+
+
+def sharpness(frame):
+    """Variance of the Laplacian on a downscaled gray copy; blur drives it to ~0."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    scale = 320 / max(gray.shape)
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
+def has_face(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    scale = 480 / max(gray.shape)
+    if scale < 1.0:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    faces = get_face_detector().detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(40, 40))
+    return len(faces) > 0
+
+
+def frame_dhash(frame, size=8):
+    """64-bit difference hash of a BGR frame (same bit layout as vision_cache.dhash)."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            value = (value << 1) | int(small[row, col] > small[row, col + 1])
+    return value
+
+
+class CameraCapture:
+    """
+    Reads the camera on a daemon thread into a ring buffer of the last
+    `buffer_size` frames, so the caller never waits on cap.read() and can
+    pick the best of the recent frames instead of whichever is current.
+    """
+
+    def __init__(self, device=0, buffer_size=30):
+        self.device = device
+        self.frames = deque(maxlen=buffer_size)   # (timestamp, frame)
+        self._lock = threading.Lock()
+        self._new_frame = threading.Condition(self._lock)
+        self._thread = None
+        self._stopping = False
+        self.cap = None
+        self.error = None
+
+    def start(self):
+        self.cap = cv2.VideoCapture(self.device)
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Could not open camera {self.device}.")
+        self._stopping = False
+        self._thread = threading.Thread(target=self._reader, name="belle-camera", daemon=True)
+        self._thread.start()
+        return self
+
+    def _reader(self):
+        while not self._stopping:
+            ret, frame = self.cap.read()
+            if not ret:
+                self.error = "Camera error."
+                break
+            with self._new_frame:
+                self.frames.append((time.monotonic(), frame))
+                self._new_frame.notify_all()
+        with self._new_frame:
+            self._new_frame.notify_all()
+
+    def stop(self):
+        self._stopping = True
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self.cap is not None:
+            self.cap.release()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- reading ----------
+    def latest(self, timeout=2.0):
+        """The newest frame, waiting up to `timeout` for the first one."""
+        with self._new_frame:
+            if not self.frames and self.error is None:
+                self._new_frame.wait(timeout)
+            return self.frames[-1][1] if self.frames else None
+
+    def recent(self, window=SELECTION_WINDOW):
+        with self._lock:
+            if not self.frames:
+                return []
+            newest = self.frames[-1][0]
+            return [frame for ts, frame in self.frames if newest - ts <= window]
+
+    def best_frame(self, window=SELECTION_WINDOW):
+        """
+        Sharpest recent frame, preferring ones with a face. Returns
+        (frame, score) or (None, 0.0) when nothing has been read yet.
+        """
+        frames = self.recent(window)
+        if not frames:
+            return None, 0.0
+
+        scored = sorted(((sharpness(f), i) for i, f in enumerate(frames)), reverse=True)
+        best, best_score = None, -1.0
+        for score, i in scored[:FACE_CANDIDATES]:
+            if has_face(frames[i]):
+                score *= FACE_BONUS
+            if score > best_score:
+                best, best_score = frames[i], score
+        return best, best_score
+
+
+def capture_best(save_path="captured.jpg", headless=False, warmup=1.5, device=0):
+    """
+    Saves the best recent frame to `save_path`. With a window, SPACE picks
+    the shot; headless, the camera settles for `warmup` seconds and the best
+    frame of that window is taken.
+    """
+    with CameraCapture(device) as camera:
+        if headless:
+            deadline = time.monotonic() + warmup
+            while time.monotonic() < deadline and camera.error is None:
+                time.sleep(0.05)
+        else:
+            print("Camera started. Press SPACE to capture.")
+            while camera.error is None:
+                frame = camera.latest()
+                if frame is not None:
+                    cv2.imshow("BELLE Camera", frame)
+                # SPACE key
+                if cv2.waitKey(15) & 0xFF == 32:
+                    break
+            cv2.destroyAllWindows()
+
+        frame, score = camera.best_frame(max(warmup, SELECTION_WINDOW) if headless else SELECTION_WINDOW)
+
+    if frame is None:
+        raise RuntimeError(camera.error or "No frames captured.")
+    cv2.imwrite(save_path, frame)
+    print(f"Saved image: {save_path} (sharpness {score:.0f})")
+    return save_path
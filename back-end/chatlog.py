@@ -0,0 +1,142 @@
+# ==========================================
+# BELLE.AI Chat Log Storage
+# Append-only JSONL log with background compaction
+# ==========================================
+
+import json
+import os
+import threading
+
+# One lock per log file, shared by every ChatLog opened on it
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(path):
+    with _locks_guard:
+        return _locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+class ChatLog:
+    """
+    Chat history stored as one JSON record per line. A turn appends its
+    messages and never rewrites earlier ones, so the cost of a write does not
+    grow with the history and a crash can at worst leave one torn last line.
+
+    Every `compact_every` appends a background thread rewrites the file,
+    dropping torn lines and, when `max_messages` is set, moving older
+    messages to `<name>.archive.jsonl` so the live log stays quick to load.
+    """
+
+    def __init__(self, path, legacy_path=None, compact_every=1000, max_messages=None, durable=True):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.compact_every = compact_every
+        self.max_messages = max_messages
+        self.durable = durable
+
+        root, _ = os.path.splitext(path)
+        self.archive_path = f"{root}.archive.jsonl"
+
+        self._lock = _lock_for(path)
+        self._appended = 0
+        self._compacting = False
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    # ---------- reading ----------
+    @staticmethod
+    def _read_lines(path):
+        records = []
+        torn = 0
+        with open(path, "rb") as f:
+            for line in f.read().splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    torn += 1
+        return records, torn
+
+    def load(self):
+        """Returns every stored message, migrating the legacy JSON list on first use."""
+        with self._lock:
+            if not os.path.exists(self.path):
+                self._migrate_legacy()
+            try:
+                records, _ = self._read_lines(self.path)
+            except FileNotFoundError:
+                records = []
+        return records
+
+    def _migrate_legacy(self):
+        messages = []
+        if self.legacy_path:
+            try:
+                with open(self.legacy_path, "r", encoding="utf-8") as f:
+                    messages = json.load(f)
+            except (FileNotFoundError, ValueError):
+                messages = []
+        self._write_all(self.path, messages)
+
+    # ---------- writing ----------
+    def append(self, *records):
+        with self._lock:
+            # reopened per call so a compaction swapping the file is never missed
+            with open(self.path, "a+b") as f:
+                if f.tell():
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b"\n":
+                        f.write(b"\n")   # terminate a torn line left by a crash
+                f.write("".join(json.dumps(r) + "\n" for r in records).encode("utf-8"))
+                f.flush()
+                if self.durable:
+                    os.fsync(f.fileno())
+            self._appended += len(records)
+            compact = self._appended >= self.compact_every and not self._compacting
+            if compact:
+                self._compacting = True
+                self._appended = 0
+
+        if compact:
+            threading.Thread(target=self._compact_in_background, daemon=True).start()
+
+    @staticmethod
+    def _write_all(path, records):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for r in records:
+                f.write(json.dumps(r) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    # ---------- compaction ----------
+    def compact(self):
+        with self._lock:
+            try:
+                records, torn = self._read_lines(self.path)
+            except FileNotFoundError:
+                return
+
+            archived = []
+            if self.max_messages and len(records) > self.max_messages:
+                archived = records[:-self.max_messages]
+                records = records[-self.max_messages:]
+
+            if not torn and not archived:
+                return
+
+            if archived:
+                with open(self.archive_path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(r) + "\n" for r in archived))
+            self._write_all(self.path, records)
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print(f"[ERROR] Chat log compaction failed: {e}")
+        finally:
+            self._compacting = False
@@ -0,0 +1,24 @@
+# ==========================================
+# BELLE.AI Configuration
+# .env is read once per process and shared by every module
+# ==========================================
+
+import os
+
+from dotenv import dotenv_values
+
+# ================== PATH SETUP ==================
+script_dir = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.abspath(os.path.join(script_dir, ".."))
+ENV_PATH = os.path.join(ROOT_DIR, ".env")
+DATA_DIR = os.path.join(ROOT_DIR, "Data")
+
+env_vars = dotenv_values(ENV_PATH)
+
+
+def get(key, default=None):
+    """Value from .env, falling back to the process environment."""
+    value = env_vars.get(key)
+    if value is None:
+        value = os.environ.get(key, default)
+    return value
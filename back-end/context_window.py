@@ -0,0 +1,236 @@
+# ==========================================
+# BELLE.AI Context Window
+# Token-budgeted history with a rolling background summary
+# ==========================================
+
+import contextvars
+import json
+import math
+import os
+import threading
+
+import config
+from conversation_store import DATA_DIR, get_store
+from history_index import HistoryIndex
+
+# ================== CONFIG ==================
+CONTEXT_TOKEN_BUDGET = int(config.get("context_token_budget", 2500))
+# Optional cap on the messages searchable for recall (newest kept); unset = all of them
+RECALL_INDEX_MESSAGES = config.get("recall_index_messages")
+RECALL_INDEX_MESSAGES = int(RECALL_INDEX_MESSAGES) if RECALL_INDEX_MESSAGES else None
+SUMMARY_PATH = os.path.join(DATA_DIR, "ChatSummary.json")
+
+SUMMARY_PROMPT = """
+You maintain a running summary of a conversation between a user and an AI assistant.
+Merge the previous summary with the new messages into one concise summary.
+Keep names, preferences, facts about the user and open questions. Use at most 200 words.
+"""
+
+# ================== TOKEN COUNTING ==================
+MESSAGE_OVERHEAD = 4   # role + separators per chat message
+
+
+def count_tokens(text: str) -> int:
+    # ~4 characters per token for English with Llama-style tokenizers
+    return math.ceil(len(text) / 4)
+
+
+def message_tokens(message) -> int:
+    return count_tokens(message.get("content", "")) + MESSAGE_OVERHEAD
+
+
+# ================== CONTEXT BUILDER ==================
+class ContextBuilder:
+    """
+    Picks the most recent messages that fit in `budget_tokens`. Messages that
+    have scrolled out of the window are folded into a running summary by a
+    background thread, `summarize_every` messages at a time, so building a
+    prompt never waits on the summarizer.
+
+    Older turns that match the new query are recalled from a BM25 index over
+    the whole history (or its last `recall_max_messages` messages, when
+    set), using at most `recall_share` of the budget.
+    """
+
+    def __init__(self, store, summarize_fn, budget_tokens=CONTEXT_TOKEN_BUDGET,
+                 summary_path=SUMMARY_PATH, max_window_messages=200, summarize_every=20,
+                 max_summarize_batch=200, recall_k=3, recall_share=0.25,
+                 recall_max_messages=RECALL_INDEX_MESSAGES):
+        self.store = store
+        self.summarize_fn = summarize_fn
+        self.budget_tokens = budget_tokens
+        self.summary_path = summary_path
+        self.max_window_messages = max_window_messages
+        self.summarize_every = summarize_every
+        self.max_summarize_batch = max_summarize_batch
+        self.recall_k = recall_k
+        self.recall_share = recall_share
+
+        self._lock = threading.Lock()
+        self._summarizing = False
+        self.summary, self.summarized_upto = self._load_summary()
+
+        # new messages are indexed as they arrive; existing ones in the background
+        self.index = HistoryIndex(max_docs=recall_max_messages)
+        store.subscribe(lambda i, message: self.index.add(i, message.get("content", "")))
+        threading.Thread(target=self._backfill_index, args=(len(store),), daemon=True).start()
+
+    def _backfill_index(self, upto, page=500):
+        # only the messages the index would keep, a page at a time
+        first = max(0, upto - self.index.max_docs) if self.index.max_docs is not None else 0
+        for start in range(first, upto, page):
+            end = min(start + page, upto)
+            for i, message in enumerate(self.store.messages(start, end), start):
+                self.index.add(i, message.get("content", ""))
+
+    # ---------- summary persistence ----------
+    def _load_summary(self):
+        try:
+            with open(self.summary_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data.get("summary", ""), data.get("upto", 0)
+        except (FileNotFoundError, ValueError):
+            return "", 0
+
+    def _save_summary(self):
+        tmp_path = f"{self.summary_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"summary": self.summary, "upto": self.summarized_upto}, f)
+        os.replace(tmp_path, self.summary_path)
+
+    # ---------- building ----------
+    def recent_window(self, reserved_tokens=0):
+        """(index of the first kept message, kept messages) within the budget."""
+        offset, candidates = self.store.tail(self.max_window_messages)
+        budget = self.budget_tokens - reserved_tokens
+
+        kept = []
+        for message in reversed(candidates):
+            cost = message_tokens(message)
+            if kept and cost > budget:
+                break
+            budget -= cost
+            kept.append(message)
+        kept.reverse()
+
+        return offset + len(candidates) - len(kept), kept
+
+    def summary_message(self):
+        with self._lock:
+            summary = self.summary
+        if not summary:
+            return []
+        return [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}]
+
+    def recall_message(self, query, before, budget):
+        """Earlier turns relevant to the query, as one system message."""
+        if not query or not before:
+            return []
+
+        ids = set()
+        for doc_id, _ in self.index.search(query, k=self.recall_k, before=before):
+            ids.add(doc_id)
+            # keep each hit together with the other half of its turn
+            pair = doc_id + 1 if self.store.get(doc_id)["role"] == "user" else doc_id - 1
+            if 0 <= pair < before:
+                ids.add(pair)
+
+        lines = []
+        for doc_id in sorted(ids):
+            message = self.store.get(doc_id)
+            line = f"{message['role']}: {message['content']}"
+            cost = count_tokens(line)
+            if cost > budget:
+                continue
+            budget -= cost
+            lines.append(line)
+
+        if not lines:
+            return []
+        return [{"role": "system", "content": "Relevant earlier messages:\n" + "\n".join(lines)}]
+
+    def build(self, query=None, reserved_tokens=0):
+        """
+        History to send with the next request: the running summary, earlier
+        turns relevant to `query` and the recent turns. `reserved_tokens` is
+        what the caller adds on top (system prompt, search results, the query).
+        """
+        summary = self.summary_message()
+        recall_budget = int(self.budget_tokens * self.recall_share) if query else 0
+        reserved = reserved_tokens + recall_budget + sum(message_tokens(m) for m in summary)
+
+        start, recent = self.recent_window(reserved)
+        recall = self.recall_message(query, start, recall_budget)
+        self._maybe_summarize(start)
+        return summary + recall + recent
+
+    # ---------- background summarization ----------
+    def _maybe_summarize(self, window_start):
+        with self._lock:
+            if self._summarizing or window_start - self.summarized_upto < self.summarize_every:
+                return
+            self._summarizing = True
+            # a long backlog (e.g. a migrated log) is skipped down to its newest part
+            end = window_start
+            begin = max(self.summarized_upto, end - self.max_summarize_batch)
+
+        threading.Thread(target=self._summarize, args=(begin, end), daemon=True).start()
+
+    def _summarize(self, begin, end):
+        try:
+            older = self.store.messages(begin, end)
+            summary = self.summarize_fn(self.summary, older)
+            if summary:
+                with self._lock:
+                    self.summary = summary
+                    self.summarized_upto = end
+                    self._save_summary()
+        except Exception as e:
+            print(f"[ERROR] Summarization failed: {e}")
+        finally:
+            with self._lock:
+                self._summarizing = False
+
+
+def groq_summarizer(client, model="llama-3.1-8b-instant"):
+    """summarize_fn that asks Groq to merge older messages into the summary."""
+
+    def summarize(previous_summary, older_messages):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in older_messages)
+        completion = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Previous summary:\n{previous_summary or '(none)'}\n\nNew messages:\n{transcript}"}
+            ],
+            temperature=0.2,
+            max_tokens=400,
+            stream=False
+        )
+        return completion.choices[0].message.content.strip()
+
+    return summarize
+
+
+# ================== SHARED INSTANCE ==================
+_builder = None
+_builder_lock = threading.Lock()
+
+# Per-session builder, set alongside conversation_store.session_store
+session_builder = contextvars.ContextVar("belle_session_builder", default=None)
+
+
+def get_context_builder(client):
+    """
+    The active session's builder, or the process-wide one (summarizing with
+    the first caller's Groq client).
+    """
+    builder = session_builder.get()
+    if builder is not None:
+        return builder
+
+    global _builder
+    with _builder_lock:
+        if _builder is None:
+            _builder = ContextBuilder(get_store(), groq_summarizer(client))
+        return _builder
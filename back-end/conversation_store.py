@@ -0,0 +1,203 @@
+# ==========================================
+# BELLE.AI Conversation Store
+# One shared in-memory history with a single batched writer
+# ==========================================
+
+import atexit
+import contextvars
+import os
+import threading
+import time
+
+import config
+from chatlog import ChatLog
+from message_db import SessionLog, get_message_db
+
+# ================== PATH SETUP ==================
+DATA_DIR = config.DATA_DIR
+CHATLOG_PATH = os.path.join(DATA_DIR, "ChatLog.jsonl")
+LEGACY_CHATLOG_PATH = os.path.join(DATA_DIR, "ChatLog.json")
+
+# "sqlite" (Data/Conversations.db) or "jsonl" (the append-only ChatLog files)
+CHAT_BACKEND = config.get("chat_backend", "sqlite").lower()
+# Session id the console conversation is stored under in the database
+LOCAL_SESSION = "local"
+
+
+class ConversationStore:
+    """
+    Holds the conversation once for every engine. Appends land in memory
+    immediately and are written to the ChatLog by one background writer,
+    which batches whatever arrived within `flush_interval` seconds.
+
+    Logs that can read a range (message_db.SessionLog) are not loaded whole:
+    only the last `memory_messages` are kept in memory and older ones are
+    read from the log when asked for.
+    """
+
+    def __init__(self, chatlog, flush_interval=0.5, memory_messages=500):
+        self.chatlog = chatlog
+        self.flush_interval = flush_interval
+        self.memory_messages = memory_messages
+        self._windowed = hasattr(chatlog, "tail")
+
+        self._lock = threading.Lock()
+        if self._windowed:
+            self._base, self._messages = chatlog.tail(memory_messages)
+        else:
+            self._base, self._messages = 0, chatlog.load()
+        self._persisted = self._base + len(self._messages)
+        self._pending = []
+        self._listeners = []
+
+        self._wakeup = threading.Condition()
+        self._flushed = threading.Condition()
+        self._writes_requested = 0
+        self._writes_done = 0
+        self._closed = False
+        self._flush_now = False
+
+        self._writer = threading.Thread(target=self._write_loop, name="belle-chatlog-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # ---------- reading ----------
+    def messages(self, start=0, end=None):
+        with self._lock:
+            total = self._base + len(self._messages)
+            start, end, _ = slice(start, end).indices(total)
+            end = max(start, end)
+            if start >= self._base:
+                return self._messages[start - self._base:end - self._base]
+            in_memory = self._messages[:max(0, end - self._base)]
+        # older than the in-memory window: already on disk, read it back
+        return self.chatlog.read(start, min(end, self._base)) + in_memory
+
+    def get(self, index):
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("message index out of range")
+        return self.messages(index, index + 1)[0]
+
+    def recent(self, n):
+        return self.tail(n)[1] if n > 0 else []
+
+    def tail(self, n):
+        """(index of the first returned message, last n messages)"""
+        with self._lock:
+            total = self._base + len(self._messages)
+        start = max(0, total - n)
+        return start, self.messages(start, total)
+
+    def __len__(self):
+        return self._base + len(self._messages)
+
+    # ---------- writing ----------
+    def append(self, *new_messages):
+        with self._lock:
+            if self._closed:
+                # the writer is gone; queueing would silently lose the messages
+                raise RuntimeError("Conversation store is closed.")
+            first_index = self._base + len(self._messages)
+            self._messages.extend(new_messages)
+            listeners = list(self._listeners)
+            with self._wakeup:
+                self._pending.extend(new_messages)
+                self._writes_requested += 1
+                self._wakeup.notify()
+        for listener in listeners:
+            for i, message in enumerate(new_messages, first_index):
+                listener(i, message)
+
+    def append_turn(self, query, answer):
+        self.append(
+            {"role": "user", "content": query},
+            {"role": "assistant", "content": answer}
+        )
+
+    def subscribe(self, listener):
+        """Calls listener(index, message) for every message appended from now on."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    # ---------- background writer ----------
+    def _write_loop(self):
+        while True:
+            with self._wakeup:
+                while not self._pending and not self._closed:
+                    self._wakeup.wait()
+                if not self._pending and self._closed:
+                    return
+                # give concurrent turns a moment to join the same batch
+                deadline = time.monotonic() + self.flush_interval
+                while not (self._closed or self._flush_now):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wakeup.wait(remaining)
+                self._flush_now = False
+                batch, self._pending = self._pending, []
+                done = self._writes_requested
+
+            try:
+                self.chatlog.append(*batch)
+                self._trim(len(batch))
+            except Exception as e:
+                print(f"[ERROR] Could not save chat log: {e}")
+
+            with self._flushed:
+                self._writes_done = done
+                self._flushed.notify_all()
+
+    def _trim(self, written):
+        """Drops saved messages beyond the in-memory window (windowed logs only)."""
+        with self._lock:
+            self._persisted += written
+            if not self._windowed or len(self._messages) <= 2 * self.memory_messages:
+                return
+            drop = min(len(self._messages) - self.memory_messages, self._persisted - self._base)
+            del self._messages[:drop]
+            self._base += drop
+
+    def flush(self, timeout=None):
+        """Blocks until everything appended so far has been written."""
+        with self._wakeup:
+            target = self._writes_requested
+            self._flush_now = True
+            self._wakeup.notify()
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._writes_done >= target, timeout)
+
+    def close(self):
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify()
+        self._writer.join(timeout=5)
+
+
+# ================== SHARED INSTANCE ==================
+_store = None
+_store_lock = threading.Lock()
+
+# Set by the server around each request, so the engines read and write that
+# session's history instead of the process-wide one
+session_store = contextvars.ContextVar("belle_session_store", default=None)
+
+
+def get_store():
+    """The active session's store, or the process-wide one every engine shares."""
+    store = session_store.get()
+    if store is not None:
+        return store
+
+    global _store
+    with _store_lock:
+        if _store is None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            chatlog = ChatLog(CHATLOG_PATH, legacy_path=LEGACY_CHATLOG_PATH)
+            if CHAT_BACKEND == "sqlite":
+                # the existing log (or legacy ChatLog.json) is imported on first use
+                chatlog = SessionLog(get_message_db(), LOCAL_SESSION, legacy_log=chatlog)
+            _store = ConversationStore(chatlog)
+        return _store
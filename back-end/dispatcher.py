@@ -0,0 +1,163 @@
+# ==========================================
+# BELLE.AI Task Dispatcher
+# Runs the tasks returned by FirstLayerDMM concurrently
+# ==========================================
+
+import contextvars
+import queue
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from registry import engines
+
+AUTOMATION_FUNCS = ["open", "close", "play", "system", "content", "google search", "youtube search", "reminder"]
+
+# Shared pool: provider calls are network bound, so threads are enough.
+# Threads start on demand, so the server's headroom costs the REPL nothing.
+executor = ThreadPoolExecutor(max_workers=int(config.get("task_workers", 64)), thread_name_prefix="belle-task")
+
+# ================== HELPERS ==================
+def clean_query(task, prefix):
+    """Cleans the task string by removing the prefix and any parentheses."""
+    query = task.replace(prefix, "", 1).strip()
+    # Remove parentheses if they wrap the query (e.g., "( query )")
+    query = re.sub(r'^\(\s*(.*?)\s*\)$', r'\1', query)
+    return query.strip()
+
+
+def is_exit(tasks):
+    return any("exit" in task.lower() for task in tasks)
+
+
+def generate_images_response(query, interactive=True):
+    # without a local user there is no viewer to open: hand back where the files are
+    result = engines.get("generate_image")(query, preview=interactive)
+    if interactive:
+        return f"I've generated the images for '{query}'. 🎨"
+    if not result or not result["images"]:
+        return f"Sorry, I couldn't generate images for '{query}'."
+
+    from image_store import get_store
+    store = get_store()
+    lines = [f"I've generated the images for '{query}'. 🎨"]
+    if result["contact_sheet"]:
+        lines.append(f"Preview: /images/{store.url_path(result['contact_sheet'])}")
+    lines += [f"Image {i}: /images/{store.url_path(path)}" for i, path in enumerate(result["images"], 1)]
+    return "\n".join(lines)
+
+
+def analyze_image_response(user_input):
+    try:
+        # For image analysis, we use the cleaned prompt if possible
+        print(f"\n[INFO] Opening image selection dialog...")
+        return engines.get("analyze_image")(user_input)
+    except Exception as e:
+        return f"Image analysis failed: {str(e)}"
+
+# ================== PLANNING ==================
+def plan_tasks(tasks, user_input, streaming=False, interactive=True):
+    """
+    Turns DMM task strings into jobs: (function, args, main_thread, streams).
+    Jobs keep the original task order; main_thread jobs (GUI dialogs)
+    cannot run on a worker thread. With streaming=True, chat and realtime
+    jobs return token generators instead of finished strings. Without a
+    local user (interactive=False) GUI jobs are replaced by a note.
+    """
+    # engines are resolved lazily so nothing is imported until a job runs
+    chat = engines.lazy("general_stream" if streaming else "general")
+    realtime = engines.lazy("realtime_stream" if streaming else "realtime")
+
+    jobs = []
+    already_handled = False
+
+    for task in tasks:
+        task = task.lower().strip()
+        engine = engines.resolve(task)
+
+        if engine == "general":
+            jobs.append((chat, (clean_query(task, "general"),), False, streaming))
+        elif engine == "realtime":
+            jobs.append((realtime, (clean_query(task, "realtime"),), False, streaming))
+        elif engine == "trend":
+            jobs.append((engines.lazy("trend"), (clean_query(task, "trend"),), False, False))
+        elif engine == "generate_image":
+            jobs.append((generate_images_response, (clean_query(task, "generate image"), interactive), False, False))
+        elif "image" in task:
+            if interactive:
+                jobs.append((analyze_image_response, (user_input,), True, False))
+            else:
+                note = "Image analysis needs the camera or file picker on this machine."
+                jobs.append((str, (note,), False, False))
+        elif any(task.startswith(func) for func in AUTOMATION_FUNCS):
+            # Not implemented yet: the first one gets a ChatBot reply, the rest a note
+            if not already_handled:
+                jobs.append((chat, (user_input,), False, streaming))
+            else:
+                note = f"(Detected intent: {task} - Not fully implemented yet)"
+                jobs.append((str, (note,), False, False))
+        else:
+            continue
+
+        already_handled = True
+
+    if not jobs:
+        # Fallback to general chat if no task is detected
+        jobs.append((chat, (user_input,), False, streaming))
+
+    return jobs
+
+# ================== EXECUTION ==================
+_DONE = object()
+
+
+def _pump(func, args, streams, out):
+    """Runs one job, pushing its output (chunk by chunk if it streams) into `out`."""
+    try:
+        if streams:
+            for chunk in func(*args):
+                out.put(chunk)
+        else:
+            out.put(func(*args))
+    except Exception as e:
+        out.put(f"[ERROR] {e}")
+    finally:
+        out.put(_DONE)
+
+
+def _start(jobs):
+    """Submits the worker jobs, then runs GUI jobs here while those are in flight."""
+    outputs = [queue.Queue() for _ in jobs]
+
+    for (func, args, main_thread, streams), out in zip(jobs, outputs):
+        if not main_thread:
+            # workers see the caller's context (e.g. the server's session)
+            executor.submit(contextvars.copy_context().run, _pump, func, args, streams, out)
+
+    for (func, args, main_thread, streams), out in zip(jobs, outputs):
+        if main_thread:
+            _pump(func, args, streams, out)
+
+    return outputs
+
+
+def stream_tasks(tasks, user_input, interactive=True):
+    """
+    Runs every planned job concurrently and yields (job_index, chunk) in the
+    original task order. The first job streams live; later jobs buffer while
+    they wait their turn, so turn latency is the slowest task, not the sum.
+    """
+    outputs = _start(plan_tasks(tasks, user_input, streaming=True, interactive=interactive))
+
+    for i, out in enumerate(outputs):
+        while True:
+            chunk = out.get()
+            if chunk is _DONE:
+                break
+            yield i, chunk
+
+
+def run_tasks(tasks, user_input):
+    """Same as stream_tasks, but returns one finished response per job."""
+    outputs = _start(plan_tasks(tasks, user_input))
+    return [out.get() for out in outputs]
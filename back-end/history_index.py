@@ -0,0 +1,99 @@
+# ==========================================
+# BELLE.AI History Index
+# Incremental BM25 search over past chat messages
+# ==========================================
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+STOPWORDS = frozenset("""
+a an the and or but if then so of to in on at by for with about from into over
+is am are was were be been being do does did have has had i me my you your he she
+it its we our they them their this that these those what which who whom how why
+when where can could would should will shall may might just not no yes please
+""".split())
+
+
+def tokenize(text: str):
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+class HistoryIndex:
+    """
+    Okapi BM25 over chat messages, keyed by their position in the store.
+    add() only touches the postings of the message's own terms, and search()
+    only walks the postings of the query terms, so neither depends on how
+    many messages are stored. With `max_docs` only that many of the newest
+    messages are kept; older ones are dropped as new ones arrive.
+    """
+
+    def __init__(self, k1=1.5, b=0.75, max_df_ratio=0.1, max_docs=None):
+        self.k1 = k1
+        self.b = b
+        # terms in more than this share of messages carry no signal; skip them
+        self.max_df_ratio = max_df_ratio
+        self.max_docs = max_docs
+
+        self._lock = threading.Lock()
+        self._postings = {}       # term -> {doc_id: term frequency}
+        self._lengths = {}        # doc_id -> number of terms
+        self._total_length = 0
+        self._terms = {}          # doc_id -> its distinct terms, to drop it again
+        self._ids = []            # min-heap of doc_ids, oldest first
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self._lengths
+
+    def add(self, doc_id, text):
+        terms = Counter(tokenize(text))
+        with self._lock:
+            if doc_id in self._lengths:
+                return
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(terms.values())
+            self._lengths[doc_id] = length
+            self._total_length += length
+            if self.max_docs is not None:
+                self._terms[doc_id] = tuple(terms)
+                heapq.heappush(self._ids, doc_id)
+                while len(self._ids) > self.max_docs:
+                    self._drop(heapq.heappop(self._ids))
+
+    def _drop(self, doc_id):
+        for term in self._terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id)
+
+    def search(self, query, k=5, before=None):
+        """Top-k (doc_id, score) for the query, optionally only ids < before."""
+        with self._lock:
+            n = len(self._lengths)
+            if not n:
+                return []
+            avg_length = self._total_length / n
+            scores = Counter()
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings or len(postings) > max(100, self.max_df_ratio * n):
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    if before is not None and doc_id >= before:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
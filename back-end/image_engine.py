@@ -1,20 +1,147 @@
-from diffusers import StableDiffusionPipeline
-import torch
+# ==========================================
+# BELLE.AI Local Image Engine
+# Offline Stable Diffusion on the CPU, loaded once on first use
+# ==========================================
 
-# Load model (first time takes time)
-pipe = StableDiffusionPipeline.from_pretrained(
-    "runwayml/stable-diffusion-v1-5"
-)
+import io
+import random
+import threading
+import time
+
+import config
+
+LOCAL_IMAGE_MODEL = config.get("local_image_model", "runwayml/stable-diffusion-v1-5")
+LOCAL_IMAGE_STEPS = int(config.get("local_image_steps", 20))
+LOCAL_IMAGE_SIZE = int(config.get("local_image_size", 384))
+# Prompts rendered per pipeline call; larger batches trade latency for throughput
+LOCAL_IMAGE_BATCH = int(config.get("local_image_batch", 2))
+# 0 = let torch decide (usually every physical core)
+LOCAL_IMAGE_THREADS = int(config.get("local_image_threads", 0))
+# "fp32" (default) or "bf16" on CPUs that support it
+LOCAL_IMAGE_PRECISION = config.get("local_image_precision", "fp32").lower()
+# "fast" halves the step count for quick drafts
+LOCAL_IMAGE_MODE = config.get("local_image_mode", "quality").lower()
+# The model's NSFW safety checker stays on unless this is explicitly "true";
+# turning it off saves a little time and memory per render
+LOCAL_IMAGE_DISABLE_SAFETY_CHECKER = config.get("local_image_disable_safety_checker", "false").lower() == "true"
+
+pipe = None
+pipe_lock = threading.Lock()
+# one render at a time: a second concurrent call would only fight for the cores
+render_lock = threading.Lock()
+
+
+def get_pipeline():
+    """Builds the CPU-tuned pipeline on first use and reuses it afterwards."""
+    global pipe
+    with pipe_lock:
+        if pipe is not None:
+            return pipe
+
+        import torch
+        from diffusers import StableDiffusionPipeline
+
+        if LOCAL_IMAGE_THREADS > 0:
+            torch.set_num_threads(LOCAL_IMAGE_THREADS)
+
+        dtype = torch.bfloat16 if LOCAL_IMAGE_PRECISION == "bf16" else torch.float32
+        started = time.perf_counter()
+        options = {}
+        if LOCAL_IMAGE_DISABLE_SAFETY_CHECKER:
+            print("[INFO] Local image safety checker disabled by local_image_disable_safety_checker.")
+            options = {"safety_checker": None, "requires_safety_checker": False}
+        pipeline = StableDiffusionPipeline.from_pretrained(LOCAL_IMAGE_MODEL, torch_dtype=dtype, **options)
+        pipeline = pipeline.to("cpu")
+        pipeline.set_progress_bar_config(disable=True)
+
+        # smaller attention working set; helps on low-memory machines
+        pipeline.enable_attention_slicing()
+        pipeline.unet.to(memory_format=torch.channels_last)
+        pipeline.vae.to(memory_format=torch.channels_last)
+
+        print(f"[INFO] Local image pipeline ready in {time.perf_counter() - started:.1f}s "
+              f"({LOCAL_IMAGE_PRECISION}, {torch.get_num_threads()} threads)")
+        pipe = pipeline
+        return pipe
+
+
+def default_steps():
+    return max(1, LOCAL_IMAGE_STEPS // 2) if LOCAL_IMAGE_MODE == "fast" else LOCAL_IMAGE_STEPS
+
+
+def render(prompts, steps=None, size=LOCAL_IMAGE_SIZE, seeds=None):
+    """
+    Renders the prompts in batches of LOCAL_IMAGE_BATCH. Returns a list of
+    (seed, PNG bytes), one per prompt.
+    """
+    import torch
+
+    pipeline = get_pipeline()
+    steps = steps or default_steps()
+    seeds = seeds or [random.randint(0, 1_000_000) for _ in prompts]
+
+    results = []
+    with render_lock, torch.inference_mode():
+        for start in range(0, len(prompts), LOCAL_IMAGE_BATCH):
+            batch = prompts[start:start + LOCAL_IMAGE_BATCH]
+            batch_seeds = seeds[start:start + LOCAL_IMAGE_BATCH]
+            images = pipeline(
+                batch,
+                num_inference_steps=steps,
+                height=size,
+                width=size,
+                generator=[torch.Generator("cpu").manual_seed(seed) for seed in batch_seeds]
+            ).images
+            for seed, image in zip(batch_seeds, images):
+                buffer = io.BytesIO()
+                image.save(buffer, "PNG")
+                results.append((seed, buffer.getvalue()))
+    return results
+
+
+def generate_images_local(prompt, variants=1, steps=None):
+    """Offline variants of one prompt as (seed, PNG bytes) pairs."""
+    return render([prompt] * variants, steps=steps)
 
-pipe = pipe.to("cpu")   # because you have i3
 
 def generate_image(prompt):
-    image = pipe(
-        prompt,
-        num_inference_steps=20,
-        height=384,
-        width=384
-    ).images[0]
-
-    image.save("output.png")
-    return "output.png"
+    """Renders one image into the image store and returns its path."""
+    from image_store import get_store
+
+    seed, image_bytes = render([prompt])[0]
+    _, path = get_store().put(image_bytes, prompt, ext=".png", seed=seed)
+    return path
+
+
+def benchmark(prompt, count=4, steps=None):
+    """Times pipeline load and rendering; returns a dict of the numbers."""
+    started = time.perf_counter()
+    get_pipeline()
+    load = time.perf_counter() - started
+
+    started = time.perf_counter()
+    render([prompt] * count, steps=steps)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "load_s": load,
+        "images": count,
+        "steps": steps or default_steps(),
+        "size": LOCAL_IMAGE_SIZE,
+        "batch": LOCAL_IMAGE_BATCH,
+        "render_s": elapsed,
+        "s_per_image": elapsed / count,
+        "images_per_min": 60 * count / elapsed
+    }
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+        prompt = " ".join(sys.argv[3:]) or "a watercolor painting of a lighthouse at dawn"
+        for name, value in benchmark(prompt, count).items():
+            print(f"  {name:<16}{value:.2f}" if isinstance(value, float) else f"  {name:<16}{value}")
+    else:
+        print(generate_image(input("Prompt: ")))
@@ -0,0 +1,247 @@
+# ==========================================
+# BELLE.AI Image Job Queue
+# SQLite-backed queue with worker threads, job IDs and progress
+# ==========================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+import config
+
+DB_PATH = os.path.join(config.DATA_DIR, "ImageJobs.db")
+
+# Workers wait on an in-process signal, but also re-check the table this often
+# so jobs submitted by another process (e.g. the frontend) are picked up quickly
+POLL_INTERVAL = 0.25
+
+# Running jobs are touched this often by the process that owns them; a job
+# not touched for STALE_AFTER seconds belongs to a process that died
+HEARTBEAT_INTERVAL = 5
+STALE_AFTER = 30
+
+ACTIVE = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    prompt      TEXT NOT NULL,
+    prompt_key  TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    progress    REAL NOT NULL DEFAULT 0,
+    result      TEXT,
+    error       TEXT,
+    owner       TEXT,
+    created     REAL NOT NULL,
+    updated     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created);
+CREATE INDEX IF NOT EXISTS jobs_prompt_status ON jobs (prompt_key, status);
+"""
+
+
+def prompt_key(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+class ImageJobQueue:
+    """
+    Persistent queue of image-generation jobs. submit() returns a job id;
+    identical prompts that are already queued or running share one job.
+    `generate_fn(prompt, progress)` does the work, calling progress(0..1),
+    and returns a JSON-serialisable result (e.g. the saved file paths).
+    """
+
+    def __init__(self, generate_fn=None, db_path=DB_PATH, workers=2):
+        self.generate_fn = generate_fn
+        self.db_path = db_path
+        self.workers = workers
+
+        # "<pid>-<random>": unique even if a pid is reused or two queues share a process
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._wakeup = threading.Condition()
+        self._threads = []
+        self._stopping = False
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        db = self._connect()
+        try:
+            db.executescript(SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                # databases created before jobs had owners
+                db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # ---------- client side ----------
+    def submit(self, prompt: str) -> str:
+        key = prompt_key(prompt)
+        now = time.time()
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT id FROM jobs WHERE prompt_key = ? AND status IN (?, ?) ORDER BY created LIMIT 1",
+                (key, *ACTIVE)
+            ).fetchone()
+            if row:
+                job_id = row["id"]
+            else:
+                job_id = uuid.uuid4().hex
+                db.execute(
+                    "INSERT INTO jobs (id, prompt, prompt_key, status, created, updated) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?)",
+                    (job_id, prompt.strip(), key, now, now)
+                )
+            db.execute("COMMIT")
+        finally:
+            db.close()
+
+        with self._wakeup:
+            self._wakeup.notify()
+        return job_id
+
+    def status(self, job_id: str):
+        db = self._connect()
+        try:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            db.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def wait(self, job_id: str, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.status(job_id)
+            if job is None or job["status"] not in ACTIVE:
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(POLL_INTERVAL)
+
+    # ---------- worker side ----------
+    def _claim(self):
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT id, prompt FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row:
+                db.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, updated = ? WHERE id = ?",
+                    (self.owner, time.time(), row["id"])
+                )
+            db.execute("COMMIT")
+            return (row["id"], row["prompt"]) if row else None
+        finally:
+            db.close()
+
+    def _update(self, job_id, **fields):
+        # only while we still own it: a job requeued as stale now belongs to someone else
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        db = self._connect()
+        try:
+            db.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND owner = ?",
+                (*fields.values(), job_id, self.owner)
+            )
+        finally:
+            db.close()
+
+    def requeue_stale(self):
+        """Puts back jobs whose owner stopped heartbeating; returns how many."""
+        db = self._connect()
+        try:
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL WHERE status = 'running' AND updated < ?",
+                (time.time() - STALE_AFTER,)
+            )
+            requeued = cursor.rowcount
+        finally:
+            db.close()
+        if requeued:
+            print(f"[INFO] Requeued {requeued} image job(s) left by a stopped worker.")
+            with self._wakeup:
+                self._wakeup.notify_all()
+        return requeued
+
+    def _heartbeat(self):
+        db = self._connect()
+        try:
+            db.execute(
+                "UPDATE jobs SET updated = ? WHERE status = 'running' AND owner = ?",
+                (time.time(), self.owner)
+            )
+        finally:
+            db.close()
+
+    def _heartbeat_loop(self):
+        while not self._stopping:
+            # a locked database must not stop the heartbeat, or other processes
+            # would take our running jobs for stale and run them again
+            try:
+                self._heartbeat()
+                self.requeue_stale()
+            except Exception as e:
+                print(f"[ERROR] Image job heartbeat: {e}")
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    def _run(self, job_id, prompt):
+        print(f"[PROCESS] Job {job_id[:8]}: generating images for: {prompt}")
+        try:
+            result = self.generate_fn(prompt, lambda p: self._update(job_id, progress=float(p)))
+            self._update(job_id, status="done", progress=1.0, result=json.dumps(result))
+            print(f"[INFO] Job {job_id[:8]} done.")
+        except Exception as e:
+            self._update(job_id, status="failed", error=str(e))
+            print(f"[ERROR] Job {job_id[:8]} failed: {e}")
+
+    def _worker_loop(self):
+        while not self._stopping:
+            try:
+                job = self._claim()
+                if job:
+                    self._run(*job)
+                    continue
+            except Exception as e:
+                # e.g. "database is locked"; keep the worker alive and retry
+                print(f"[ERROR] Image job worker: {e}")
+                time.sleep(1)
+            with self._wakeup:
+                self._wakeup.wait(POLL_INTERVAL)
+
+    def start(self):
+        # the heartbeat also picks up jobs left 'running' by a process that died;
+        # jobs another live process is still running are left alone
+        thread = threading.Thread(target=self._heartbeat_loop, name="belle-image-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"belle-image-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
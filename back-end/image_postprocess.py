@@ -0,0 +1,122 @@
+# ==========================================
+# BELLE.AI Image Post-processing
+# Validation, thumbnails, contact sheets, non-blocking preview
+# ==========================================
+
+import io
+import os
+import threading
+
+from PIL import Image
+
+FORMAT_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif", "BMP": ".bmp"}
+
+THUMBNAIL_SIZE = 256
+
+
+def decode(image_bytes):
+    """Decodes once and fully, so a truncated response fails here, not in a viewer."""
+    img = Image.open(io.BytesIO(image_bytes))
+    img.load()
+    return img
+
+
+def image_extension(img):
+    """Extension of the image's real format, whatever the API claimed."""
+    return FORMAT_EXTENSIONS.get(img.format, ".png")
+
+
+def save_thumbnail(img, path, size=THUMBNAIL_SIZE):
+    thumb = img.convert("RGB")
+    thumb.thumbnail((size, size), Image.LANCZOS)
+    thumb.save(path, "JPEG", quality=85, optimize=True)
+    return thumb
+
+
+def save_contact_sheet(thumbnails, path, columns=2, padding=8, background=(24, 24, 24)):
+    """Lays the thumbnails out in one grid image."""
+    if not thumbnails:
+        return None
+    cell_w = max(t.width for t in thumbnails)
+    cell_h = max(t.height for t in thumbnails)
+    rows = (len(thumbnails) + columns - 1) // columns
+    sheet = Image.new(
+        "RGB",
+        (columns * cell_w + (columns + 1) * padding, rows * cell_h + (rows + 1) * padding),
+        background
+    )
+    for i, thumb in enumerate(thumbnails):
+        row, col = divmod(i, columns)
+        x = padding + col * (cell_w + padding) + (cell_w - thumb.width) // 2
+        y = padding + row * (cell_h + padding) + (cell_h - thumb.height) // 2
+        sheet.paste(thumb, (x, y))
+    sheet.save(path, "JPEG", quality=90)
+    return path
+
+
+def load_thumbnail(store, digest, blob_path):
+    """The stored thumbnail, rebuilt from the blob if it is missing."""
+    path = store.thumbnail_path(digest)
+    if os.path.exists(path):
+        with Image.open(path) as thumb:
+            thumb.load()
+            return path, thumb.copy()
+    with Image.open(blob_path) as img:
+        return path, save_thumbnail(img, path)
+
+
+def build_previews(store, entries):
+    """
+    entries: [(digest, blob path)]. Returns {"images", "thumbnails",
+    "contact_sheet"} for the batch, reusing whatever is already on disk.
+    """
+    images, thumbnail_paths, thumbnails = [], [], []
+    for digest, blob_path in entries:
+        try:
+            thumb_path, thumb = load_thumbnail(store, digest, blob_path)
+        except Exception as e:
+            print(f"[ERROR] Could not preview {blob_path}: {e}")
+            continue
+        images.append(blob_path)
+        thumbnail_paths.append(thumb_path)
+        thumbnails.append(thumb)
+
+    sheet = store.sheet_path([digest for digest, _ in entries])
+    if not os.path.exists(sheet):
+        sheet = save_contact_sheet(thumbnails, sheet)
+    return {"images": images, "thumbnails": thumbnail_paths, "contact_sheet": sheet}
+
+
+def process_results(results, store, prompt, existing=()):
+    """
+    results: list of (seed, image bytes). Validates each image, adds it to
+    the content-addressed store with a thumbnail, then builds the sheet
+    together with any `existing` (digest, path) entries.
+    """
+    entries = list(existing)
+    for seed, image_bytes in results:
+        try:
+            img = decode(image_bytes)
+        except Exception as e:
+            print(f"[ERROR] Image for seed {seed} is not valid: {e}")
+            continue
+        digest, path = store.put(image_bytes, prompt, ext=image_extension(img), seed=seed)
+        if not os.path.exists(store.thumbnail_path(digest)):
+            save_thumbnail(img, store.thumbnail_path(digest))
+        entries.append((digest, path))
+
+    return build_previews(store, entries)
+
+
+def preview_async(path):
+    """Opens the image in the default viewer without blocking the caller."""
+    def show():
+        try:
+            with Image.open(path) as img:
+                img.show()
+        except Exception as e:
+            print(f"[ERROR] Could not open preview {path}: {e}")
+
+    thread = threading.Thread(target=show, daemon=True)
+    thread.start()
+    return thread
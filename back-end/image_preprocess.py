@@ -0,0 +1,134 @@
+# ==========================================
+# BELLE.AI Vision Pre-processing
+# Orient, crop, downscale and recompress images before upload
+# ==========================================
+
+import io
+import os
+
+from PIL import Image, ImageOps
+
+import config
+
+# Grooming advice does not need full-resolution pixels
+VISION_MAX_EDGE = int(config.get("vision_max_edge", 1024))
+# "jpeg" or "webp"
+VISION_FORMAT = config.get("vision_format", "jpeg").lower()
+VISION_QUALITY = int(config.get("vision_quality", 82))
+# "none", "face", or a box "left,top,right,bottom" in 0..1 fractions of the image
+VISION_CROP = config.get("vision_crop", "none").lower()
+
+# Context kept around a detected face, as a multiple of its size (hair, neck, collar)
+FACE_MARGIN = 0.6
+
+MIME_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+face_detector = None
+
+
+def get_face_detector():
+    global face_detector
+    if face_detector is None:
+        import cv2
+        face_detector = cv2.CascadeClassifier(
+            os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        )
+    return face_detector
+
+
+def find_face(img):
+    """Largest face as a (left, top, right, bottom) box, or None."""
+    import cv2
+    import numpy as np
+
+    # detection does not need many pixels either
+    probe = img.convert("L")
+    scale = min(1.0, 640 / max(probe.size))
+    if scale < 1.0:
+        probe = probe.resize((int(probe.width * scale), int(probe.height * scale)))
+
+    faces = get_face_detector().detectMultiScale(
+        np.asarray(probe), scaleFactor=1.1, minNeighbors=5, minSize=(40, 40)
+    )
+    if len(faces) == 0:
+        return None
+    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    return tuple(int(v / scale) for v in (x, y, x + w, y + h))
+
+
+def crop_box(img, crop):
+    """Resolves `crop` ("face", a fraction box string or tuple) to pixels."""
+    if crop == "face":
+        face = find_face(img)
+        if face is None:
+            return None
+        left, top, right, bottom = face
+        pad_x = (right - left) * FACE_MARGIN
+        pad_y = (bottom - top) * FACE_MARGIN
+        return (
+            max(0, int(left - pad_x)),
+            max(0, int(top - pad_y)),
+            min(img.width, int(right + pad_x)),
+            min(img.height, int(bottom + pad_y * 1.5))
+        )
+
+    if isinstance(crop, str):
+        crop = [float(v) for v in crop.split(",")]
+    left, top, right, bottom = crop
+    box = (int(left * img.width), int(top * img.height), int(right * img.width), int(bottom * img.height))
+    return box if box[2] > box[0] and box[3] > box[1] else None
+
+
+def prepare_image(image_path, max_edge=VISION_MAX_EDGE, fmt=VISION_FORMAT, quality=VISION_QUALITY,
+                  crop=VISION_CROP):
+    """
+    Returns (image bytes, mime type, stats). The image is rotated upright
+    from its EXIF tag, optionally cropped, shrunk so its longest edge is at
+    most `max_edge` and re-encoded as JPEG or WebP at `quality`.
+    """
+    original_bytes = os.path.getsize(image_path)
+
+    with Image.open(image_path) as img:
+        original_size = img.size
+        if not crop or crop == "none":
+            # lets the JPEG decoder scale down by 2/4/8 while decoding big photos
+            img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+
+        if crop and crop != "none":
+            try:
+                box = crop_box(img, crop)
+            except Exception as e:
+                print(f"[ERROR] Could not crop image: {e}")
+                box = None
+            if box:
+                img = img.crop(box)
+
+        if max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        if img.mode not in ("RGB", "L"):
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            if img.mode in ("RGBA", "LA") or "transparency" in img.info:
+                rgba = img.convert("RGBA")
+                background.paste(rgba, mask=rgba.getchannel("A"))
+            else:
+                background.paste(img.convert("RGB"))
+            img = background
+
+        buffer = io.BytesIO()
+        if fmt == "webp":
+            img.save(buffer, "WEBP", quality=quality, method=4)
+        else:
+            fmt = "jpeg"
+            img.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+
+    data = buffer.getvalue()
+    stats = {
+        "original_bytes": original_bytes,
+        "bytes": len(data),
+        "saved_bytes": original_bytes - len(data),
+        "original_size": original_size,
+        "size": img.size
+    }
+    return data, MIME_TYPES[fmt], stats
@@ -0,0 +1,215 @@
+# ==========================================
+# BELLE.AI Image Store
+# Content-addressed blobs with an SQLite index and a size quota
+# ==========================================
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import config
+
+STORE_DIR = os.path.join(config.DATA_DIR, "ImageStore")
+
+# Total bytes of original images kept before the least recently used go
+IMAGE_STORE_QUOTA = int(float(config.get("image_store_quota_mb", 512)) * 1024 * 1024)
+
+# Contact sheets are cheap to rebuild, so only the newest few are kept
+MAX_SHEETS = 50
+
+# The only files resolve() hands out: finished blobs, thumbnails and sheets.
+# The index (and its -wal/-shm files) and half-written *.tmp blobs never match.
+SERVABLE_PATH = re.compile(
+    r"^(blobs/[0-9a-f]{2}/[0-9a-f]{64}\.(png|jpg|webp|gif|bmp)|(thumbnails|sheets)/[0-9a-f]{64}\.jpg)$"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    digest      TEXT PRIMARY KEY,
+    ext         TEXT NOT NULL,
+    prompt      TEXT NOT NULL,
+    prompt_key  TEXT NOT NULL,
+    seed        INTEGER,
+    size        INTEGER NOT NULL,
+    created     REAL NOT NULL,
+    accessed    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_prompt_key ON images (prompt_key, created);
+CREATE INDEX IF NOT EXISTS images_accessed ON images (accessed);
+"""
+
+
+def prompt_key(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+class ImageStore:
+    """
+    Generated images stored once under the sha256 of their bytes, so file
+    names never depend on the prompt and nothing is overwritten. The index
+    maps prompts to blobs; lookup() serves repeated prompts from disk and
+    evict() drops the least recently used blobs once `quota` bytes is passed.
+    """
+
+    def __init__(self, root=STORE_DIR, quota=IMAGE_STORE_QUOTA):
+        self.root = root
+        self.quota = quota
+        self.db_path = os.path.join(root, "index.db")
+        self._evict_lock = threading.Lock()
+
+        for sub in ("blobs", "thumbnails", "sheets"):
+            os.makedirs(os.path.join(root, sub), exist_ok=True)
+        db = self._connect()
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    # ---------- paths ----------
+    def blob_path(self, digest, ext):
+        # two-level fan-out keeps directories small
+        return os.path.join(self.root, "blobs", digest[:2], digest + ext)
+
+    def thumbnail_path(self, digest):
+        return os.path.join(self.root, "thumbnails", digest + ".jpg")
+
+    def url_path(self, path):
+        """Store-relative path with forward slashes, e.g. for /images/<path> URLs."""
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def resolve(self, url_path):
+        """Inverse of url_path(); None for anything but a stored image, thumbnail or sheet."""
+        if not SERVABLE_PATH.match(url_path):
+            return None
+        path = os.path.join(self.root, *url_path.split("/"))
+        return path if os.path.isfile(path) else None
+
+    def sheet_path(self, digests):
+        name = hashlib.sha256("\n".join(digests).encode("utf-8")).hexdigest()
+        return os.path.join(self.root, "sheets", name + ".jpg")
+
+    # ---------- writes ----------
+    def put(self, image_bytes, prompt, ext=".png", seed=None):
+        """Stores the bytes (once) and indexes them; returns (digest, path)."""
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        path = self.blob_path(digest, ext)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(image_bytes)
+            os.replace(tmp_path, path)
+
+        now = time.time()
+        db = self._connect()
+        try:
+            db.execute(
+                "INSERT INTO images (digest, ext, prompt, prompt_key, seed, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(digest) DO UPDATE SET accessed = excluded.accessed",
+                (digest, ext, prompt.strip(), prompt_key(prompt), seed, len(image_bytes), now, now)
+            )
+        finally:
+            db.close()
+        return digest, path
+
+    # ---------- reads ----------
+    def lookup(self, prompt, limit=None):
+        """Stored images for this prompt, newest first, as dicts with a `path`."""
+        db = self._connect()
+        try:
+            rows = db.execute(
+                "SELECT * FROM images WHERE prompt_key = ? ORDER BY created DESC LIMIT ?",
+                (prompt_key(prompt), -1 if limit is None else limit)
+            ).fetchall()
+            entries = []
+            for row in rows:
+                entry = dict(row)
+                entry["path"] = self.blob_path(entry["digest"], entry["ext"])
+                if os.path.exists(entry["path"]):
+                    entries.append(entry)
+                else:
+                    # removed behind our back; forget it
+                    db.execute("DELETE FROM images WHERE digest = ?", (entry["digest"],))
+            if entries:
+                db.execute(
+                    f"UPDATE images SET accessed = ? WHERE digest IN ({', '.join('?' * len(entries))})",
+                    (time.time(), *(e["digest"] for e in entries))
+                )
+        finally:
+            db.close()
+        return entries
+
+    def stats(self):
+        db = self._connect()
+        try:
+            row = db.execute(
+                "SELECT COUNT(*) AS images, COALESCE(SUM(size), 0) AS bytes, "
+                "COUNT(DISTINCT prompt_key) AS prompts FROM images"
+            ).fetchone()
+        finally:
+            db.close()
+        return {**dict(row), "quota": self.quota}
+
+    # ---------- eviction ----------
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self):
+        """Drops least recently used images until the store fits its quota."""
+        with self._evict_lock:
+            db = self._connect()
+            try:
+                total = db.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()[0]
+                removed = 0
+                if total > self.quota:
+                    for row in db.execute(
+                        "SELECT digest, ext, size FROM images ORDER BY accessed"
+                    ).fetchall():
+                        if total <= self.quota:
+                            break
+                        self._remove(self.blob_path(row["digest"], row["ext"]))
+                        self._remove(self.thumbnail_path(row["digest"]))
+                        db.execute("DELETE FROM images WHERE digest = ?", (row["digest"],))
+                        total -= row["size"]
+                        removed += 1
+            finally:
+                db.close()
+
+            sheets_dir = os.path.join(self.root, "sheets")
+            sheets = sorted(
+                (entry for entry in os.scandir(sheets_dir) if entry.is_file()),
+                key=lambda entry: entry.stat().st_mtime,
+                reverse=True
+            )
+            for entry in sheets[MAX_SHEETS:]:
+                self._remove(entry.path)
+
+        if removed:
+            print(f"[INFO] Image store: evicted {removed} image(s) to stay under quota.")
+        return removed
+
+
+store = None
+store_lock = threading.Lock()
+
+
+def get_store():
+    """The shared ImageStore, created on first use."""
+    global store
+    with store_lock:
+        if store is None:
+            store = ImageStore()
+        return store
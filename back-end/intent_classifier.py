@@ -0,0 +1,252 @@
+# ==========================================
+# BELLE.AI Local Intent Classifier
+# Fast-path tier in front of FirstLayerDMM
+# ==========================================
+
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+# ================== PATH SETUP ==================
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DMM_LOG_PATH = os.path.join(script_dir, "..", "Data", "DMMLog.jsonl")
+
+# ================== RULES ==================
+# Only unambiguous single-intent phrasings are handled locally. Anything that
+# looks like it carries several requests goes to the remote model, which knows
+# how to split them.
+MULTI_INTENT = re.compile(r",|;|&|\band\b|\bthen\b|\balso\b|\bplus\b")
+
+EXIT_RULE = re.compile(
+    r"^(ok(ay)?\s+)?(bye|goodbye|good\s?bye|good night|see you( later| soon)?)"
+    r"(\s+\w+)?[\s.!]*$"
+)
+
+# open/close/play take an app, site or title: at most three words, and not
+# a pronoun ("close your eyes", "open up to me" are conversation, not commands)
+NAME_ARG = r"(?!(up|your|yourself|me|my|it|him|her|them|us)\b)(?P<arg>[\w'-]+(\.[\w'-]+)*( [\w'-]+(\.[\w'-]+)*){0,2})"
+
+RULES = [
+    (re.compile(r"^(please\s+)?open\s+" + NAME_ARG + r"[.!]*$"), "open"),
+    (re.compile(r"^(please\s+)?close\s+" + NAME_ARG + r"[.!]*$"), "close"),
+    (re.compile(r"^(please\s+)?play\s+(?!with\b|a game\b)" + NAME_ARG + r"[.!]*$"), "play"),
+    (re.compile(
+        r"^(please\s+)?(generate|create|make|draw)\s+(an?\s+)?(image|picture|photo)\s+"
+        r"(of\s+)?(?P<arg>.+?)[.!]*$"
+    ), "generate image"),
+    (re.compile(r"^(please\s+)?(google search|search google for)\s+(?P<arg>.+?)[.!?]*$"), "google search"),
+    (re.compile(r"^(please\s+)?(youtube search|search youtube for)\s+(?P<arg>.+?)[.!?]*$"), "youtube search"),
+    (re.compile(r"^(please\s+)?(?P<arg>mute|unmute|volume up|volume down)[.!]*$"), "system"),
+]
+
+# Time / date questions are always 'general' (see the DMM preamble).
+GENERAL_RULE = re.compile(
+    r"^(what('s| is)|tell me)\s+(the\s+)?(today's\s+)?(time|date|day|month|year)"
+    r"(\s+(is it|today|now))?\s*\??$"
+)
+
+# ================== TEXT HELPERS ==================
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.lower().split())
+
+
+def tokenize(text: str):
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    # unigrams + bigrams keep short phrasings like "who is" / "news about" apart
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def normalize_tasks(tasks):
+    return [re.sub(r"[^\w\s]", "", t).strip() for t in tasks]
+
+
+# ================== CLASSIFIER ==================
+class IntentClassifier:
+    """
+    Rules + TF-IDF centroid (Rocchio) model trained on logged DMM outputs.
+    classify() returns a task list when confident, otherwise None.
+    """
+
+    # labels whose DMM output simply echoes the query
+    LABELS = ("general", "realtime")
+
+    def __init__(self, log_path=DMM_LOG_PATH, min_similarity=0.35, min_margin=0.12,
+                 min_examples=20, shadow_rate=0.05, retrain_every=25):
+        self.log_path = log_path
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.min_examples = min_examples
+        self.shadow_rate = shadow_rate
+        self.retrain_every = retrain_every
+
+        self._lock = threading.Lock()
+        self._examples = []
+        self._pending = 0
+        self._idf = {}
+        self._centroids = {}
+        self._counts = Counter()
+
+        self.stats = Counter()
+
+        self._load_log()
+        self.train()
+
+    # ---------- training data ----------
+    def _load_log(self):
+        try:
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    self._add_example(record.get("prompt", ""), record.get("tasks", []))
+        except FileNotFoundError:
+            pass
+
+    def _add_example(self, prompt, tasks):
+        if len(tasks) != 1:
+            return
+        label = tasks[0].split(" ", 1)[0]
+        if label in self.LABELS and prompt.strip():
+            self._examples.append((normalize_prompt(prompt), label))
+
+    def record(self, prompt: str, tasks, source="remote"):
+        """Log a remote DMM answer and use it as a training example."""
+        record = {"prompt": prompt, "tasks": tasks, "source": source, "ts": time.time()}
+        with self._lock:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self._add_example(prompt, tasks)
+            self._pending += 1
+            retrain = self._pending >= self.retrain_every
+        if retrain:
+            self.train()
+
+    def train(self):
+        with self._lock:
+            examples = list(self._examples)
+            self._pending = 0
+
+        docs = [(Counter(tokenize(text)), label) for text, label in examples]
+        df = Counter()
+        for tf, _ in docs:
+            df.update(tf.keys())
+        n = len(docs)
+        idf = {term: math.log((1 + n) / (1 + freq)) + 1 for term, freq in df.items()}
+
+        sums = defaultdict(Counter)
+        counts = Counter()
+        for tf, label in docs:
+            vec = self._vectorize(tf, idf)
+            for term, weight in vec.items():
+                sums[label][term] += weight
+            counts[label] += 1
+
+        centroids = {}
+        for label, total in sums.items():
+            norm = math.sqrt(sum(w * w for w in total.values())) or 1.0
+            centroids[label] = {t: w / norm for t, w in total.items()}
+
+        with self._lock:
+            self._idf = idf
+            self._centroids = centroids
+            self._counts = counts
+
+    @staticmethod
+    def _vectorize(tf, idf):
+        vec = {t: c * idf[t] for t, c in tf.items() if t in idf}
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {t: w / norm for t, w in vec.items()}
+
+    # ---------- prediction ----------
+    def _match_rules(self, text):
+        if EXIT_RULE.match(text):
+            return ["exit"], "rules"
+        if MULTI_INTENT.search(text):
+            return None, None
+        if GENERAL_RULE.match(text):
+            return [f"general {text}"], "rules"
+        for pattern, func in RULES:
+            m = pattern.match(text)
+            if m:
+                return [f"{func} {m.group('arg').strip()}"], "rules"
+        return None, None
+
+    def _predict_model(self, text):
+        if MULTI_INTENT.search(text):
+            return None, 0.0
+        centroids = self._centroids
+        if len(centroids) < 2 or any(self._counts[l] < self.min_examples for l in self.LABELS):
+            return None, 0.0
+
+        vec = self._vectorize(Counter(tokenize(text)), self._idf)
+        scores = sorted(
+            ((sum(w * c.get(t, 0.0) for t, w in vec.items()), label) for label, c in centroids.items()),
+            reverse=True
+        )
+        (best, label), (second, _) = scores[0], scores[1]
+        if best >= self.min_similarity and best - second >= self.min_margin:
+            return label, best
+        return None, best
+
+    def classify(self, prompt: str):
+        text = normalize_prompt(prompt)
+        if not text:
+            return None
+
+        tasks, source = self._match_rules(text)
+        if tasks is None:
+            label, _ = self._predict_model(text)
+            if label:
+                tasks, source = [f"{label} {text}"], "model"
+
+        if tasks is None:
+            self.stats["fallbacks"] += 1
+            return None
+
+        self.stats["local_hits"] += 1
+        self.stats[f"{source}_hits"] += 1
+        return tasks
+
+    # ---------- accuracy against the remote model ----------
+    def maybe_shadow(self, prompt: str, local_tasks, remote_fn):
+        """Occasionally re-ask the remote model in the background and compare."""
+        if random.random() >= self.shadow_rate:
+            return
+
+        def check():
+            try:
+                remote_tasks = remote_fn(prompt)
+            except Exception:
+                return
+            self.stats["shadow_checks"] += 1
+            if normalize_tasks(remote_tasks) == normalize_tasks(local_tasks):
+                self.stats["shadow_agree"] += 1
+            self.record(prompt, remote_tasks, source="shadow")
+
+        threading.Thread(target=check, daemon=True).start()
+
+    def report(self):
+        total = self.stats["local_hits"] + self.stats["fallbacks"]
+        checks = self.stats["shadow_checks"]
+        return {
+            "queries": total,
+            "local_hits": self.stats["local_hits"],
+            "rules_hits": self.stats["rules_hits"],
+            "model_hits": self.stats["model_hits"],
+            "remote_fallbacks": self.stats["fallbacks"],
+            "hit_rate": self.stats["local_hits"] / total if total else 0.0,
+            "shadow_checks": checks,
+            "accuracy": self.stats["shadow_agree"] / checks if checks else None,
+            "training_examples": len(self._examples),
+        }
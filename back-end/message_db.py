@@ -0,0 +1,192 @@
+# ==========================================
+# BELLE.AI Message Database
+# SQLite (WAL) sessions + messages, indexed for per-session tail reads
+# ==========================================
+
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+DB_PATH = os.path.join(config.DATA_DIR, "Conversations.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id              TEXT PRIMARY KEY,
+    created         REAL NOT NULL,
+    updated         REAL NOT NULL,
+    message_count   INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS messages (
+    session_id  TEXT NOT NULL,
+    seq         INTEGER NOT NULL,
+    role        TEXT NOT NULL,
+    content     TEXT NOT NULL,
+    created     REAL NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS messages_session_created ON messages (session_id, created);
+CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+"""
+
+
+class MessageDB:
+    """
+    Every session's messages in one SQLite file. Messages are keyed by
+    (session, position), so the last N of a session is one index range scan
+    no matter how much history is stored.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        db = self._connect()
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        # WAL makes NORMAL safe against corruption; only the last batch can be lost on power cut
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    # ---------- writes ----------
+    def append(self, session_id, messages):
+        """Appends a batch to the session in one transaction; returns the new count."""
+        now = time.time()
+        db = self._connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "INSERT OR IGNORE INTO sessions (id, created, updated) VALUES (?, ?, ?)",
+                (session_id, now, now)
+            )
+            count = db.execute(
+                "SELECT message_count FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()[0]
+            db.executemany(
+                "INSERT INTO messages (session_id, seq, role, content, created) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (session_id, count + i, m.get("role", "user"), m.get("content", ""), now)
+                    for i, m in enumerate(messages)
+                ]
+            )
+            count += len(messages)
+            db.execute(
+                "UPDATE sessions SET message_count = ?, updated = ? WHERE id = ?",
+                (count, now, session_id)
+            )
+            db.execute("COMMIT")
+            return count
+        except BaseException:
+            if db.in_transaction:
+                db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+
+    # ---------- reads ----------
+    def count(self, session_id):
+        db = self._connect()
+        try:
+            row = db.execute("SELECT message_count FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        finally:
+            db.close()
+        return row[0] if row else 0
+
+    def read(self, session_id, start=0, end=None):
+        """Messages [start, end) of the session, oldest first."""
+        db = self._connect()
+        try:
+            rows = db.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? AND seq >= ? AND seq < ? ORDER BY seq",
+                (session_id, start, end if end is not None else 2 ** 62)
+            ).fetchall()
+        finally:
+            db.close()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def tail(self, session_id, n):
+        """(position of the first returned message, last n messages)."""
+        db = self._connect()
+        try:
+            rows = db.execute(
+                "SELECT seq, role, content FROM messages WHERE session_id = ? ORDER BY seq DESC LIMIT ?",
+                (session_id, n)
+            ).fetchall()
+        finally:
+            db.close()
+        rows.reverse()
+        start = rows[0][0] if rows else self.count(session_id)
+        return start, [{"role": role, "content": content} for _, role, content in rows]
+
+    def sessions(self, limit=50, before=None):
+        """Most recently active sessions, newest first, paginated by `updated`."""
+        db = self._connect()
+        try:
+            rows = db.execute(
+                "SELECT id, created, updated, message_count FROM sessions WHERE updated < ? "
+                "ORDER BY updated DESC LIMIT ?",
+                (before if before is not None else float("inf"), limit)
+            ).fetchall()
+        finally:
+            db.close()
+        return [dict(zip(("id", "created", "updated", "message_count"), row)) for row in rows]
+
+
+class SessionLog:
+    """
+    One session of a MessageDB with the ChatLog interface ConversationStore
+    writes through, plus tail()/read() so it never has to load everything.
+    On first use it imports `legacy_log` (a ChatLog) if the session is empty.
+    """
+
+    def __init__(self, db, session_id, legacy_log=None):
+        self.db = db
+        self.session_id = session_id
+        self.legacy_log = legacy_log
+
+    def migrate(self):
+        if self.legacy_log is None or self.db.count(self.session_id):
+            return 0
+        messages = self.legacy_log.load()
+        if messages:
+            self.db.append(self.session_id, messages)
+            print(f"[INFO] Migrated {len(messages)} messages into session {self.session_id}.")
+        return len(messages)
+
+    def load(self):
+        self.migrate()
+        return self.db.read(self.session_id)
+
+    def tail(self, n):
+        self.migrate()
+        return self.db.tail(self.session_id, n)
+
+    def read(self, start, end):
+        return self.db.read(self.session_id, start, end)
+
+    def count(self):
+        return self.db.count(self.session_id)
+
+    def append(self, *records):
+        if records:
+            self.db.append(self.session_id, records)
+
+
+# ================== SHARED INSTANCE ==================
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_message_db():
+    global _db
+    with _db_lock:
+        if _db is None:
+            _db = MessageDB()
+        return _db
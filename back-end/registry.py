@@ -0,0 +1,85 @@
+# ==========================================
+# BELLE.AI Engine Registry
+# Engines are imported (and their clients built) on first use
+# ==========================================
+
+import importlib
+import threading
+import time
+
+
+class EngineRegistry:
+    """
+    Maps engine names / intent prefixes to "module:attribute" and imports the
+    module only when the engine is first called. Import cost of every engine
+    is recorded in `timings` for the startup report.
+    """
+
+    def __init__(self):
+        self._specs = {}       # name -> (module, attribute)
+        self._prefixes = []    # (intent prefix, engine name), longest prefix first
+        self._loaded = {}
+        self._locks = {}
+        self.timings = {}      # module -> seconds spent importing it
+
+    def register(self, name, module, attribute, prefix=None):
+        self._specs[name] = (module, attribute)
+        self._locks.setdefault(module, threading.Lock())
+        if prefix:
+            self._prefixes.append((prefix, name))
+            self._prefixes.sort(key=lambda p: len(p[0]), reverse=True)
+
+    def get(self, name):
+        engine = self._loaded.get(name)
+        if engine is not None:
+            return engine
+
+        module_name, attribute = self._specs[name]
+        # one lock per module: different engines still load in parallel
+        with self._locks[module_name]:
+            if name not in self._loaded:
+                start = time.perf_counter()
+                module = importlib.import_module(module_name)
+                self.timings.setdefault(module_name, time.perf_counter() - start)
+                self._loaded[name] = getattr(module, attribute)
+        return self._loaded[name]
+
+    def lazy(self, name):
+        """A stand-in function that loads the engine when it is first called."""
+        def call(*args, **kwargs):
+            return self.get(name)(*args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def resolve(self, task):
+        """Engine name for a DMM task string, by its intent prefix."""
+        for prefix, name in self._prefixes:
+            if task.startswith(prefix):
+                return name
+        return None
+
+    def is_loaded(self, name):
+        return name in self._loaded
+
+    def preload(self, *names):
+        for name in names or list(self._specs):
+            self.get(name)
+
+    def report(self):
+        lines = [f"{module:<24}{seconds * 1000:>10.1f} ms"
+                 for module, seconds in sorted(self.timings.items(), key=lambda t: -t[1])]
+        return "\n".join(lines) or "(no engines loaded yet)"
+
+
+# ================== BELLE ENGINES ==================
+engines = EngineRegistry()
+engines.register("dmm", "Model", "FirstLayerDMM")
+engines.register("dmm_quick", "Model", "QuickDMM")
+engines.register("dmm_remote", "Model", "RemoteFirstLayerDMM")
+engines.register("general", "Chatbot", "ChatBot", prefix="general")
+engines.register("general_stream", "Chatbot", "ChatBotStream")
+engines.register("realtime", "RealtimeSearchEngine", "RealtimeSearchEngine", prefix="realtime")
+engines.register("realtime_stream", "RealtimeSearchEngine", "RealtimeSearchEngineStream")
+engines.register("trend", "trend_engine", "trend_engine", prefix="trend")
+engines.register("generate_image", "ImageGenration", "GenerateImages", prefix="generate image")
+engines.register("analyze_image", "Image_Analyzer", "analyze_image")
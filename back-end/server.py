@@ -0,0 +1,340 @@
+# ==========================================
+# BELLE.AI Server
+# asyncio HTTP + Server-Sent Events front door for many concurrent sessions
+# ==========================================
+
+import asyncio
+import contextvars
+import json
+import mimetypes
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import config
+from dispatcher import is_exit
+from speculation import speculator
+
+SERVER_HOST = config.get("server_host", "127.0.0.1")
+SERVER_PORT = int(config.get("server_port", 8765))
+# Turns running at once (each holds provider connections and a worker thread)
+SERVER_MAX_TURNS = int(config.get("server_max_turns", 64))
+# Turns allowed to queue for a slot; past this new turns get 503 + Retry-After
+SERVER_MAX_PENDING = int(config.get("server_max_pending", 256))
+SERVER_ALLOW_ORIGIN = config.get("server_allow_origin", "*")
+
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+MAX_MESSAGE_CHARS = 4000
+
+_END = object()
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+# ================== HTTP PLUMBING ==================
+async def read_request(reader):
+    """(method, path, query params, headers, body) of one HTTP/1.1 request."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large.")
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line.")
+
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+    if length < 0:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length.")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large.")
+    body = await reader.readexactly(length) if length else b""
+
+    url = urlsplit(target)
+    params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+    return method.upper(), url.path.rstrip("/") or "/", params, headers, body
+
+
+def response_head(status, content_type, extra=None):
+    status = HTTPStatus(status)
+    headers = {
+        "Content-Type": content_type,
+        "Access-Control-Allow-Origin": SERVER_ALLOW_ORIGIN,
+        "Access-Control-Allow-Headers": "Content-Type",
+        "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
+        "Connection": "close",
+        **(extra or {})
+    }
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def send_json(writer, status, payload, headers=None):
+    body = json.dumps(payload).encode("utf-8")
+    writer.write(response_head(status, "application/json", {"Content-Length": len(body), **(headers or {})}))
+    writer.write(body)
+    await writer.drain()
+
+
+async def send_event(writer, event, data):
+    writer.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+    # waits while the client's socket buffer is full: slow readers slow their own turn only
+    await writer.drain()
+
+
+# ================== SERVER ==================
+class BelleServer:
+    """
+    Serves the same decide-then-dispatch pipeline as Main.py to many users.
+    Turns run on worker threads (the engines are blocking) in the session's
+    context; tokens come back to the event loop and out as SSE events.
+    """
+
+    def __init__(self, sessions, max_turns=SERVER_MAX_TURNS, max_pending=SERVER_MAX_PENDING):
+        self.sessions = sessions
+        self.max_turns = max_turns
+        self.max_pending = max_pending
+
+        self.executor = ThreadPoolExecutor(max_workers=max_turns, thread_name_prefix="belle-turn")
+        self.slots = None
+        self.waiting = 0
+        self.active = 0
+        self.stats = {"turns": 0, "rejected": 0, "errors": 0, "turn_seconds": 0.0}
+
+    # ---------- turns ----------
+    def _run_turn(self, session, message, emit):
+        """Worker thread: classify, dispatch, and emit every chunk."""
+        session.activate()
+        try:
+            tasks, chunks = speculator.run_turn(message, interactive=False)
+            if is_exit(tasks):
+                emit(("chunk", 0, "Take care. I'm always here for you 🌸"))
+                return
+            for index, chunk in chunks:
+                emit(("chunk", index, chunk))
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[ERROR] Turn failed for session {session.id[:8]}: {e}")
+            emit(("error", 0, "Something went wrong. Please try again."))
+        finally:
+            emit(_END)
+
+    async def turn(self, session, message, writer):
+        if self.waiting >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy, try again shortly.", {"Retry-After": "1"})
+
+        self.waiting += 1
+        try:
+            await session.turn_lock.acquire()
+            try:
+                await self.slots.acquire()
+            except BaseException:
+                session.turn_lock.release()
+                raise
+        finally:
+            self.waiting -= 1
+
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+        started = time.perf_counter()
+        self.active += 1
+        try:
+            writer.write(response_head(HTTPStatus.OK, "text/event-stream", {"Cache-Control": "no-cache"}))
+            connected = True
+            try:
+                await send_event(writer, "session", {"session_id": session.id})
+            except ConnectionError:
+                connected = False
+
+            # a fresh context per turn, so session state never leaks between threads
+            context = contextvars.copy_context()
+            loop.run_in_executor(
+                self.executor, context.run, self._run_turn, session, message,
+                lambda item: loop.call_soon_threadsafe(events.put_nowait, item)
+            )
+
+            # keep draining after a disconnect so the turn still finishes and is saved
+            while (item := await events.get()) is not _END:
+                kind, index, text = item
+                if connected:
+                    try:
+                        await send_event(writer, kind, {"task": index, "text": text})
+                    except ConnectionError:
+                        connected = False
+            if connected:
+                try:
+                    await send_event(writer, "done", {})
+                except ConnectionError:
+                    pass
+        finally:
+            self.active -= 1
+            self.stats["turns"] += 1
+            self.stats["turn_seconds"] += time.perf_counter() - started
+            self.slots.release()
+            session.turn_lock.release()
+
+    # ---------- routes ----------
+    async def _session(self, session_id):
+        """The session, pinned open: callers must self.sessions.release() it."""
+        try:
+            # loading a session reads its log from disk
+            return await asyncio.to_thread(self.sessions.get, session_id)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+
+    async def route(self, method, path, params, body, writer):
+        if method == "OPTIONS":
+            writer.write(response_head(HTTPStatus.NO_CONTENT, "text/plain", {"Content-Length": 0}))
+            await writer.drain()
+            return
+
+        if path == "/health" and method == "GET":
+            turns = self.stats["turns"]
+            await send_json(writer, HTTPStatus.OK, {
+                **self.stats,
+                "avg_turn_seconds": self.stats["turn_seconds"] / turns if turns else 0.0,
+                "active": self.active,
+                "waiting": self.waiting,
+                "sessions_open": len(self.sessions),
+                "speculation": speculator.report()
+            })
+            return
+
+        if path == "/sessions" and method == "POST":
+            session = await self._session(None)
+            self.sessions.release(session)
+            await send_json(writer, HTTPStatus.CREATED, {"session_id": session.id})
+            return
+
+        parts = path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "sessions" and parts[2] == "messages" and method == "GET":
+            session = await self._session(parts[1])
+            try:
+                try:
+                    limit = min(int(params.get("limit", 50)), 500)
+                    # pages go backwards: pass the previous page's "start" as "before"
+                    before = int(params.get("before", len(session.store)))
+                except ValueError:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "limit and before must be numbers.")
+                start = max(0, min(before, len(session.store)) - limit)
+                messages = await asyncio.to_thread(session.store.messages, start, max(start, before))
+            finally:
+                self.sessions.release(session)
+            await send_json(writer, HTTPStatus.OK, {"start": start, "messages": messages})
+            return
+
+        if parts[0] == "images" and len(parts) > 1 and method == "GET":
+            # generated images, linked from "generate image" replies
+            from image_store import get_store
+            file_path = get_store().resolve("/".join(parts[1:]))
+            if file_path is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, "Not found.")
+            data = await asyncio.to_thread(lambda: open(file_path, "rb").read())
+            content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+            writer.write(response_head(HTTPStatus.OK, content_type, {
+                "Content-Length": len(data), "Cache-Control": "public, max-age=86400"
+            }))
+            writer.write(data)
+            await writer.drain()
+            return
+
+        if path == "/chat":
+            # POST only: a turn changes the session, and an EventSource GET would be
+            # re-sent (and the turn run again) every time the connection closes.
+            # The reply is an SSE stream read with fetch(); it ends with a "done" event.
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Use POST.", {"Allow": "POST, OPTIONS"})
+            try:
+                params = {**params, **json.loads(body or b"{}")}
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Body must be JSON.")
+            message = str(params.get("message", "")).strip()
+            if not message:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "message is required.")
+            if len(message) > MAX_MESSAGE_CHARS:
+                raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "message is too long.")
+            session = await self._session(params.get("session_id"))
+            try:
+                # turn() returns only once the turn has finished and been saved
+                await self.turn(session, message, writer)
+            finally:
+                self.sessions.release(session)
+            return
+
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Not found.")
+
+    async def handle(self, reader, writer):
+        try:
+            method, path, params, headers, body = await read_request(reader)
+            await self.route(method, path, params, body, writer)
+        except HTTPError as e:
+            try:
+                await send_json(writer, e.status, {"error": str(e)}, e.headers)
+            except ConnectionError:
+                pass
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"[ERROR] Request failed: {e}")
+            try:
+                await send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Internal error."})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    async def _close_idle_sessions(self, every=60):
+        while True:
+            await asyncio.sleep(every)
+            closed = await asyncio.to_thread(self.sessions.close_idle)
+            if closed:
+                print(f"[INFO] Closed {closed} idle session(s).")
+
+    async def serve(self, host=SERVER_HOST, port=SERVER_PORT):
+        self.slots = asyncio.Semaphore(self.max_turns)
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+        janitor = asyncio.create_task(self._close_idle_sessions())
+        print(f"[INFO] BELLE server listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            janitor.cancel()
+            self.sessions.close_all()
+            self.executor.shutdown(wait=False)
+
+
+def serve(host=SERVER_HOST, port=SERVER_PORT):
+    """Runs the server until interrupted, sharing one Groq client for summaries."""
+    from Chatbot import client
+    from context_window import groq_summarizer
+    from sessions import SessionManager
+
+    server = BelleServer(SessionManager(groq_summarizer(client)))
+    try:
+        asyncio.run(server.serve(host, port))
+    except KeyboardInterrupt:
+        print("\n[INFO] Server stopped.")
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,147 @@
+# ==========================================
+# BELLE.AI Sessions
+# Per-user conversation state for the server
+# ==========================================
+
+import asyncio
+import atexit
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+import config
+from chatlog import ChatLog
+from conversation_store import CHAT_BACKEND, ConversationStore, session_store
+from context_window import ContextBuilder, session_builder
+from message_db import SessionLog, get_message_db
+
+SESSIONS_DIR = os.path.join(config.DATA_DIR, "Sessions")
+# Up to max_open sessions are held at once, so each keeps a smaller recall index
+SESSION_RECALL_MESSAGES = int(config.get("session_recall_messages", 200))
+
+# Session ids become file names, so only accept what new_session_id() makes
+SESSION_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def valid_session_id(session_id):
+    return bool(session_id) and SESSION_ID_PATTERN.match(session_id) is not None
+
+
+class Session:
+    """One user's history, context builder and turn lock."""
+
+    def __init__(self, session_id, store, builder):
+        self.id = session_id
+        self.store = store
+        self.builder = builder
+        self.last_used = time.monotonic()
+        # requests holding the session (see SessionManager.get/release); never closed while > 0
+        self.pins = 0
+        # turns of one session run one at a time, in order
+        self.turn_lock = asyncio.Lock()
+
+    def activate(self):
+        """Makes the engines use this session in the current context."""
+        session_store.set(self.store)
+        session_builder.set(self.builder)
+
+    def close(self):
+        self.store.close()
+        # the store registered itself for exit; let it be garbage collected
+        atexit.unregister(self.store.close)
+
+
+class SessionManager:
+    """
+    Opens sessions on demand and keeps at most `max_open` of them loaded;
+    the least recently used are closed (their history stays on disk) and
+    so are any idle for `idle_timeout` seconds. get() pins the session it
+    returns and a pinned session is never closed, so every get() must be
+    paired with release().
+    """
+
+    def __init__(self, summarize_fn, root=SESSIONS_DIR, max_open=500, idle_timeout=30 * 60):
+        self.summarize_fn = summarize_fn
+        self.root = root
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+
+        self._lock = threading.Lock()
+        self._open = OrderedDict()
+        os.makedirs(root, exist_ok=True)
+
+    def _load(self, session_id):
+        chatlog = ChatLog(os.path.join(self.root, f"{session_id}.jsonl"))
+        if CHAT_BACKEND == "sqlite":
+            # only the recent window is read; a session's old JSONL log is imported once
+            legacy = chatlog if os.path.exists(chatlog.path) else None
+            chatlog = SessionLog(get_message_db(), session_id, legacy_log=legacy)
+        store = ConversationStore(chatlog)
+        builder = ContextBuilder(
+            store, self.summarize_fn,
+            summary_path=os.path.join(self.root, f"{session_id}.summary.json"),
+            recall_max_messages=SESSION_RECALL_MESSAGES
+        )
+        return Session(session_id, store, builder)
+
+    def get(self, session_id=None):
+        """The session for `session_id` (a new one when None), pinned until release()."""
+        session_id = session_id or new_session_id()
+        if not valid_session_id(session_id):
+            raise ValueError("Invalid session id.")
+
+        closing = []
+        with self._lock:
+            session = self._open.get(session_id)
+            if session is None:
+                session = self._load(session_id)
+                self._open[session_id] = session
+            self._open.move_to_end(session_id)
+            session.last_used = time.monotonic()
+            session.pins += 1
+
+            # oldest first; a session some request still holds is never closed under it
+            for old in list(self._open.values()):
+                if len(self._open) - len(closing) <= self.max_open:
+                    break
+                if not old.pins:
+                    closing.append(old)
+            for old in closing:
+                del self._open[old.id]
+
+        for old in closing:
+            old.close()
+        return session
+
+    def release(self, session):
+        with self._lock:
+            session.pins -= 1
+            session.last_used = time.monotonic()
+
+    def close_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = [s for s in self._open.values()
+                    if now - s.last_used > self.idle_timeout and not s.pins]
+            for session in idle:
+                del self._open[session.id]
+        for session in idle:
+            session.close()
+        return len(idle)
+
+    def close_all(self):
+        with self._lock:
+            sessions = list(self._open.values())
+            self._open.clear()
+        for session in sessions:
+            session.close()
+
+    def __len__(self):
+        return len(self._open)
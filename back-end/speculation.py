@@ -0,0 +1,147 @@
+# ==========================================
+# BELLE.AI Speculative Chat
+# Start the ChatBot answer while Cohere is still classifying the turn
+# ==========================================
+
+import contextvars
+import queue
+import threading
+import time
+
+import config
+from registry import engines
+from conversation_store import get_store
+from dispatcher import stream_tasks
+
+# Off by default: a miss costs one Groq call that is thrown away
+SPECULATIVE_CHAT = config.get("speculative_chat", "false").lower() == "true"
+
+_DONE = object()
+
+
+class Speculation:
+    """
+    One ChatBot answer generated on a background thread before we know the
+    turn is general chat. Tokens are buffered until keep() streams them;
+    nothing is written to the chat log unless the answer is kept.
+    """
+
+    def __init__(self, query):
+        self.query = query
+        self.store = get_store()
+        self.started = time.perf_counter()
+        self.finished = None
+        self.tokens = 0
+        self.answer = None
+
+        self._chunks = queue.Queue()
+        self._cancelled = threading.Event()
+        context = contextvars.copy_context()
+        threading.Thread(target=context.run, args=(self._produce,), name="belle-speculation", daemon=True).start()
+
+    def _produce(self):
+        stream = None
+        try:
+            # inside the try: an engine that fails to load must still end the stream
+            stream = engines.get("general_stream")(self.query, save=False)
+            while not self._cancelled.is_set():
+                try:
+                    token = next(stream)
+                except StopIteration as done:
+                    self.answer = done.value
+                    break
+                self.tokens += 1
+                self._chunks.put(token)
+        except Exception as e:
+            self._chunks.put(f"[ERROR] {e}")
+        finally:
+            # closing the generator also closes the Groq stream
+            if stream is not None:
+                stream.close()
+            self.finished = time.perf_counter()
+            self._chunks.put(_DONE)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def keep(self):
+        """Yields the buffered answer, then the rest live; logs the turn at the end."""
+        while (chunk := self._chunks.get()) is not _DONE:
+            yield chunk
+        if self.answer is not None:
+            self.store.append_turn(self.query, self.answer)
+
+
+class SpeculativeChat:
+    """
+    Decides a turn and returns its chunks. When the intent is not already
+    known locally, the ChatBot answer is started alongside the remote DMM;
+    it is kept if the DMM says "one general task" and cancelled otherwise.
+    """
+
+    def __init__(self, enabled=SPECULATIVE_CHAT):
+        self.enabled = enabled
+        self.dmm = engines.lazy("dmm")
+        self.quick_dmm = engines.lazy("dmm_quick")
+        self.remote_dmm = engines.lazy("dmm_remote")
+
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.wasted_tokens = 0
+
+    @staticmethod
+    def is_general_chat(tasks):
+        return len(tasks) == 1 and engines.resolve(tasks[0].lower().strip()) == "general"
+
+    def run_turn(self, user_input, interactive=True):
+        """(tasks, generator of (job_index, chunk)) for one turn."""
+        if not self.enabled:
+            tasks = self.dmm(user_input)
+            return tasks, stream_tasks(tasks, user_input, interactive=interactive)
+
+        tasks = self.quick_dmm(user_input)
+        if tasks is not None:
+            # known without a round-trip: nothing to overlap with
+            return tasks, stream_tasks(tasks, user_input, interactive=interactive)
+
+        speculation = Speculation(user_input)
+        try:
+            # QuickDMM already missed: go straight to Cohere so nothing is counted twice
+            tasks = self.remote_dmm(user_input)
+        except BaseException:
+            speculation.cancel()
+            raise
+        decided = time.perf_counter()
+
+        with self._lock:
+            self.started += 1
+            if self.is_general_chat(tasks):
+                self.hits += 1
+                # the answer got this much of a head start (at most its whole run)
+                self.saved_seconds += min(decided, speculation.finished or decided) - speculation.started
+                return tasks, ((0, chunk) for chunk in speculation.keep())
+
+            self.misses += 1
+        speculation.cancel()
+        with self._lock:
+            self.wasted_tokens += speculation.tokens
+        return tasks, stream_tasks(tasks, user_input, interactive=interactive)
+
+    def report(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "speculated": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / self.started if self.started else 0.0,
+                "saved_seconds": self.saved_seconds,
+                "avg_saved_seconds": self.saved_seconds / self.hits if self.hits else 0.0,
+                "wasted_tokens": self.wasted_tokens,
+            }
+
+
+speculator = SpeculativeChat()
@@ -0,0 +1,89 @@
+# ==========================================
+# BELLE.AI Local Summarizer
+# CPU-only extractive summaries (TextRank over TF-IDF sentences)
+# ==========================================
+
+import math
+import re
+from collections import Counter
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+TOKEN_PATTERN = re.compile(r"[a-z0-9%+']+")
+
+STOPWORDS = frozenset("""
+a an the and or but of to in on at by for with about from into is are was were be
+been it its this that these those as than then so such very can will just also
+""".split())
+
+
+def split_sentences(text):
+    return [s.strip() for s in SENTENCE_SPLIT.split(text) if s and s.strip()]
+
+
+def _vector(tokens, idf):
+    tf = Counter(tokens)
+    vec = {t: c * idf.get(t, 0.0) for t, c in tf.items()}
+    norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+    return {t: w / norm for t, w in vec.items()}
+
+
+def rank_sentences(sentences, damping=0.85, iterations=30):
+    """
+    TextRank scores: PageRank over the TF-IDF cosine-similarity graph.
+    Returns (scores, similarity matrix).
+    """
+    tokens = [[t for t in TOKEN_PATTERN.findall(s.lower()) if t not in STOPWORDS] for s in sentences]
+    n = len(sentences)
+    df = Counter(t for sent in tokens for t in set(sent))
+    idf = {t: math.log((1 + n) / (1 + f)) + 1 for t, f in df.items()}
+    vectors = [_vector(sent, idf) for sent in tokens]
+
+    weights = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(i + 1, n):
+            a, b = vectors[i], vectors[j]
+            if len(a) > len(b):
+                a, b = b, a
+            sim = sum(w * b.get(t, 0.0) for t, w in a.items())
+            weights[i][j] = weights[j][i] = sim
+
+    out_sums = [sum(row) or 1.0 for row in weights]
+    scores = [1.0] * n
+    for _ in range(iterations):
+        scores = [
+            (1 - damping) + damping * sum(weights[j][i] / out_sums[j] * scores[j] for j in range(n))
+            for i in range(n)
+        ]
+    return scores, weights
+
+
+def summarize(text, max_sentences=6, max_chars=1200, keep_first=True, max_input_sentences=200,
+              max_overlap=0.7):
+    """
+    The highest-ranked sentences of `text`, in their original order.
+    keep_first always keeps the opening line (e.g. the topic header);
+    sentences more than `max_overlap` similar to a chosen one are skipped.
+    """
+    sentences = split_sentences(text)[:max_input_sentences]
+    if len(sentences) <= max_sentences and len(text) <= max_chars:
+        return text.strip()
+
+    scores, similarity = rank_sentences(sentences)
+    order = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+    if keep_first and sentences:
+        order.remove(0)
+        order.insert(0, 0)
+
+    chosen = []
+    length = 0
+    for i in order:
+        if len(chosen) >= max_sentences:
+            break
+        if length + len(sentences[i]) > max_chars and chosen:
+            continue
+        if any(similarity[i][j] > max_overlap for j in chosen):
+            continue
+        chosen.append(i)
+        length += len(sentences[i]) + 1
+
+    return "\n".join(sentences[i] for i in sorted(chosen))
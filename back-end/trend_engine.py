@@ -3,22 +3,50 @@
 # Social Trend + Grooming Intelligence Layer
 # ==========================================
 
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
 import requests
-from dotenv import dotenv_values
 from groq import Groq
+import config
+from ttl_cache import TTLCache
+from trends_parser import parse_google_trends
+from summarizer import summarize
 
 # ==============================
 # LOAD ENVIRONMENT VARIABLES
 # ==============================
-env = dotenv_values(".env")
+GROQ_API_KEY = config.get("groq_api_key")
+SERPAPI_API_KEY = config.get("SERPAPI_API_KEY")
+APIFY_API_KEY = config.get("APIFY_API_KEY")
+HF_API_KEY = config.get("Hugging_Face_api")
 
-GROQ_API_KEY = env.get("groq_api_key")
-SERPAPI_API_KEY = env.get("SERPAPI_API_KEY")
-APIFY_API_KEY = env.get("APIFY_API_KEY")
-HF_API_KEY = env.get("Hugging_Face_api")
+# "local" (default, extractive, no network), "remote" (Hugging Face BART) or "off"
+TREND_SUMMARIZER = config.get("trend_summarizer", "local").lower()
 
 client = Groq(api_key=GROQ_API_KEY)
 
+# ==============================
+# CONCURRENCY + CACHING
+# ==============================
+# Upstream trend data changes slowly; reuse it per topic for a few hours
+TREND_CACHE_TTL = int(config.get("trend_cache_ttl", 6 * 3600))
+# How long the fetch stage may take before we go on with what came back
+TREND_FETCH_BUDGET = float(config.get("trend_fetch_budget", 8))
+
+trend_cache = TTLCache(
+    path=os.path.join(config.DATA_DIR, "TrendCache.json"),
+    max_entries=200,
+    ttl=TREND_CACHE_TTL
+)
+
+# Up to three sources per question, so this serves several questions at once
+TREND_FETCH_WORKERS = int(config.get("trend_fetch_workers", 16))
+
+executor = ThreadPoolExecutor(max_workers=TREND_FETCH_WORKERS, thread_name_prefix="belle-trend")
+
 # ==============================
 # SYSTEM PROMPT FOR BELLE
 # ==============================
@@ -35,27 +63,32 @@ Your job:
 # ==============================
 # SERPAPI GOOGLE TRENDS FETCH
 # ==============================
-def fetch_google_trends(query: str):
+def _serpapi_trends(query: str, data_type: str, restrict_to: str):
+    url = "https://serpapi.com/search.json"
 
-    if not SERPAPI_API_KEY:
-        return "No Google trends data available."
+    params = {
+        "engine": "google_trends",
+        "q": query,
+        "data_type": data_type,
+        # ask SerpAPI to send only the part we parse
+        "json_restrictor": restrict_to,
+        "api_key": SERPAPI_API_KEY
+    }
 
-    try:
-        url = "https://serpapi.com/search.json"
+    # reads give up after the fetch budget, so a stalled source frees its worker
+    response = requests.get(url, params=params, timeout=(3, TREND_FETCH_BUDGET))
+    data = response.json()
+    if "error" in data:
+        raise RuntimeError(data["error"])
+    return parse_google_trends(data)
 
-        params = {
-            "engine": "google_trends",
-            "q": query,
-            "api_key": SERPAPI_API_KEY
-        }
 
-        response = requests.get(url, params=params, timeout=20)
-        data = response.json()
+def _google_trends(query: str):
+    return _serpapi_trends(query, "TIMESERIES", "interest_over_time").render()
 
-        return str(data)[:800]
 
-    except Exception as e:
-        return f"Google Trends Error: {str(e)}"
+def _google_related_queries(query: str):
+    return _serpapi_trends(query, "RELATED_QUERIES", "related_queries").render()
 
 
 # ==============================
@@ -101,14 +134,86 @@ def hf_summarize(text):
         return text
 
 
+def summarize_trends(text):
+    """Summarization stage; the remote BART hop is opt-in via trend_summarizer."""
+    if TREND_SUMMARIZER == "off":
+        return text
+    if TREND_SUMMARIZER == "remote":
+        return hf_summarize(text)
+    return summarize(text, max_sentences=8, max_chars=1200)
+
+
 # ==============================
-# MAIN TREND ENGINE FUNCTION
+# PARALLEL FETCH STAGE
 # ==============================
-def trend_engine(user_query: str):
+def topic_key(query: str):
+    return " ".join(query.lower().split())
+
+
+def _timed_cached(source, fetch, query):
+    """Runs one fetcher through the topic cache; returns (result, seconds)."""
+    start = time.perf_counter()
+    key = f"{source}:{topic_key(query)}"
+    result = trend_cache.get(key)
+    if result is None:
+        result = fetch(query)
+        trend_cache.set(key, result)
+    return result, time.perf_counter() - start
+
+
+def fetch_trend_sources(query: str, timings):
+    """
+    Fetches every available source concurrently and returns {source: text}
+    for whatever finished within TREND_FETCH_BUDGET, recording those sources'
+    times in `timings`. Late results still land in the cache for the next
+    question on the same topic.
+    """
+    sources = {}
+    if SERPAPI_API_KEY:
+        sources["google_trends"] = _google_trends
+        sources["google_related"] = _google_related_queries
+    if APIFY_API_KEY:
+        sources["social_trends"] = fetch_social_trends
+
+    futures = {
+        executor.submit(_timed_cached, name, fetch, query): name
+        for name, fetch in sources.items()
+    }
+    done, pending = wait(futures, timeout=TREND_FETCH_BUDGET)
+
+    results = {}
+    for future in done:
+        name = futures[future]
+        if future.exception() is None:
+            results[name], timings[name] = future.result()
+        else:
+            results[name] = f"Unavailable ({future.exception()})"
+    for future in pending:
+        results[futures[future]] = "Unavailable (timed out)"
+
+    return results
 
-    # Step 1 — Fetch data
-    google_trends = fetch_google_trends(user_query)
-    social_trends = fetch_social_trends(user_query)
+
+# ==============================
+# MAIN TREND ENGINE FUNCTION
+# ==============================
+def trend_engine(user_query: str, with_timings: bool = False):
+    """
+    BELLE trend answer. The per-stage timings are always logged; with
+    with_timings=True they are also returned, as (answer, timings) where
+    timings maps each stage to seconds.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    # Step 1 — Fetch data (concurrently, within the latency budget)
+    fetched = fetch_trend_sources(user_query, timings)
+    timings["fetch"] = time.perf_counter() - started
+
+    google_trends = "\n".join(
+        fetched[name] for name in ("google_trends", "google_related") if fetched.get(name)
+    ) or "No Google trends data available."
+    social_trends = fetched.get("social_trends", "No social media trend data available.")
 
     combined_data = f"""
 User Topic: {user_query}
@@ -120,8 +225,19 @@ Social Media Trends:
 {social_trends}
 """
 
-    # Step 2 — HuggingFace Summarization Layer
-    summarized_data = hf_summarize(combined_data)
+    # Step 2 — Summarization Layer (local by default; remote results cached per input)
+    stage = time.perf_counter()
+    if TREND_SUMMARIZER == "remote":
+        summary_key = "summary:" + hashlib.sha1(combined_data.encode("utf-8")).hexdigest()
+        summarized_data = trend_cache.get(summary_key)
+        if summarized_data is None:
+            summarized_data = summarize_trends(combined_data)
+            # hf_summarize hands the input back when the API fails; don't keep that
+            if summarized_data != combined_data:
+                trend_cache.set(summary_key, summarized_data)
+    else:
+        summarized_data = summarize_trends(combined_data)
+    timings["summarize"] = time.perf_counter() - stage
 
     # Step 3 — BELLE AI Response Generation (Groq)
     messages = [
@@ -129,6 +245,7 @@ Social Media Trends:
         {"role": "user", "content": summarized_data}
     ]
 
+    stage = time.perf_counter()
     completion = client.chat.completions.create(
         model="llama-3.1-8b-instant",
         messages=messages,
@@ -136,8 +253,15 @@ Social Media Trends:
         max_tokens=700,
         stream=False
     )
+    answer = completion.choices[0].message.content
+    timings["generate"] = time.perf_counter() - stage
+    timings["total"] = time.perf_counter() - started
+    # the dispatcher and the server call without with_timings; log the breakdown for them
+    print("[INFO] Trend timings: " + ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in timings.items()))
 
-    return completion.choices[0].message.content
+    if with_timings:
+        return answer, timings
+    return answer
 
 
 # ==============================
@@ -147,7 +271,11 @@ if __name__ == "__main__":
     print("\n--- BELLE Trend Engine Test ---\n")
 
     query = input("Enter trend topic: ")
-    result = trend_engine(query)
+    result, timings = trend_engine(query, with_timings=True)
 
     print("\nBELLE says:\n")
     print(result)
+
+    print("\nTimings:")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<15}{seconds * 1000:>9.1f} ms")
@@ -0,0 +1,112 @@
+# ==========================================
+# BELLE.AI Google Trends Parser
+# Compact, typed view of SerpAPI google_trends responses
+# ==========================================
+
+from dataclasses import dataclass, field
+from typing import List, Tuple
+
+
+@dataclass
+class TrendSeries:
+    query: str
+    points: List[Tuple[str, int]] = field(default_factory=list)   # (date label, 0-100)
+
+    def latest(self):
+        return self.points[-1][1] if self.points else None
+
+    def peak(self):
+        return max(self.points, key=lambda p: p[1]) if self.points else None
+
+    def change_pct(self, window=4):
+        """Mean of the last `window` points vs the `window` before them."""
+        if len(self.points) < 2 * window:
+            return None
+        recent = sum(v for _, v in self.points[-window:]) / window
+        before = sum(v for _, v in self.points[-2 * window:-window]) / window
+        if not before:
+            return None
+        return (recent - before) / before * 100
+
+
+@dataclass
+class RelatedQuery:
+    query: str
+    value: int     # rise in % (rising) or relative interest 0-100 (top)
+    label: str     # SerpAPI's display value, e.g. "+250%" or "Breakout"
+
+
+@dataclass
+class TrendsSummary:
+    series: List[TrendSeries] = field(default_factory=list)
+    rising: List[RelatedQuery] = field(default_factory=list)
+    top: List[RelatedQuery] = field(default_factory=list)
+
+    def is_empty(self):
+        return not (self.series or self.rising or self.top)
+
+    def top_movers(self, n=5):
+        return sorted(self.rising, key=lambda q: q.value, reverse=True)[:n]
+
+    def render(self, max_items=5):
+        """Dense plain-text summary meant to be pasted into a prompt."""
+        lines = []
+        for s in self.series:
+            if not s.points:
+                continue
+            parts = [f"{s.query}: interest now {s.latest()}/100"]
+            change = s.change_pct()
+            if change is not None:
+                parts.append(f"{change:+.0f}% vs prior 4 periods")
+            peak_date, peak_value = s.peak()
+            parts.append(f"peak {peak_value} ({peak_date})")
+            lines.append(", ".join(parts))
+
+        if self.rising:
+            movers = ", ".join(f"{q.query} ({q.label})" for q in self.top_movers(max_items))
+            lines.append(f"Rising searches: {movers}")
+        if self.top:
+            top = ", ".join(f"{q.query} ({q.value})" for q in self.top[:max_items])
+            lines.append(f"Top searches: {top}")
+
+        return "\n".join(lines)
+
+
+# ================== PARSING ==================
+def _int(value, default=0):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _related(items):
+    queries = []
+    for item in items or []:
+        label = str(item.get("value", ""))
+        # "Breakout" means a >5000% rise; extracted_value carries the number
+        value = _int(item.get("extracted_value"), 5000 if label.lower() == "breakout" else 0)
+        queries.append(RelatedQuery(item.get("query", ""), value, label or str(value)))
+    return queries
+
+
+def parse_google_trends(data):
+    """Extracts interest over time and related queries from a SerpAPI payload."""
+    summary = TrendsSummary()
+    if not isinstance(data, dict):
+        return summary
+
+    by_query = {}
+    timeline = (data.get("interest_over_time") or {}).get("timeline_data") or []
+    for point in timeline:
+        for v in point.get("values", []):
+            name = v.get("query", "")
+            series = by_query.setdefault(name, TrendSeries(name))
+            series.points.append((point.get("date", ""), _int(v.get("extracted_value", v.get("value")))))
+    summary.series = list(by_query.values())
+
+    related = data.get("related_queries") or {}
+    summary.rising = _related(related.get("rising"))
+    summary.top = _related(related.get("top"))
+
+    return summary
@@ -0,0 +1,132 @@
+# ==========================================
+# BELLE.AI Persistent TTL Cache
+# Bounded LRU cache with per-entry expiry, saved under Data/
+# ==========================================
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# ================== PATH SETUP ==================
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(script_dir, "..", "Data")
+
+
+class TTLCache:
+    """
+    LRU cache whose entries expire after `ttl` seconds (overridable per entry).
+    Values must be JSON serialisable. When `path` is given the cache is loaded
+    from disk on start, saved every `save_every` writes and again at exit.
+    """
+
+    def __init__(self, path=None, max_entries=1000, ttl=7 * 24 * 3600, save_every=10):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.save_every = save_every
+
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._data = OrderedDict()   # key -> (expires_at, value)
+        self._dirty = 0
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.path:
+            self.load()
+            atexit.register(self.save)
+
+    # ---------- access ----------
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                self._dirty += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._dirty += 1
+            flush = self.path and self._dirty >= self.save_every
+        if flush:
+            self.save()
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            return entry is not None and entry[0] >= time.time()
+
+    def items(self):
+        """Unexpired (key, value) pairs, oldest first; does not touch LRU order."""
+        now = time.time()
+        with self._lock:
+            return [(k, v) for k, (exp, v) in self._data.items() if exp >= now]
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._dirty += 1
+
+    # ---------- persistence ----------
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+
+        now = time.time()
+        with self._lock:
+            # stored oldest-first, so insertion order restores LRU order
+            for key, expires_at, value in entries:
+                if expires_at >= now:
+                    self._data[key] = (expires_at, value)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            now = time.time()
+            entries = [[k, exp, v] for k, (exp, v) in self._data.items() if exp >= now]
+            self._dirty = 0
+
+        with self._save_lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+
+    # ---------- stats ----------
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
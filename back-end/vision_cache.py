@@ -0,0 +1,100 @@
+# ==========================================
+# BELLE.AI Vision Result Cache
+# Aya Vision answers keyed by a perceptual image hash plus the prompt
+# ==========================================
+
+import os
+import threading
+
+from PIL import Image, ImageOps
+
+import config
+from ttl_cache import TTLCache
+
+# Max differing bits (of 64) for two images to count as the same picture
+VISION_CACHE_THRESHOLD = int(config.get("vision_cache_threshold", 6))
+VISION_CACHE_TTL = int(config.get("vision_cache_ttl", 24 * 3600))
+
+
+def dhash(image_path, size=8):
+    """
+    64-bit difference hash: compares neighbouring pixels of a tiny grayscale
+    copy, so re-encodes, resizes and small camera shifts barely change it.
+    """
+    with Image.open(image_path) as img:
+        img.draft("L", (size * 8, size * 8))
+        img = ImageOps.exif_transpose(img).convert("L").resize((size + 1, size), Image.LANCZOS)
+        pixels = list(img.getdata())
+
+    value = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def prompt_key(prompt: str) -> str:
+    return " ".join(prompt.lower().split()).rstrip(".!?")
+
+
+class VisionCache:
+    """
+    Exact (hash, prompt) matches are a dict lookup; otherwise the entries for
+    the same prompt are scanned for a hash within `threshold` bits.
+    """
+
+    def __init__(self, path=os.path.join(config.DATA_DIR, "VisionCache.json"),
+                 threshold=VISION_CACHE_THRESHOLD, ttl=VISION_CACHE_TTL, max_entries=500):
+        self.threshold = threshold
+        self.cache = TTLCache(path=path, max_entries=max_entries, ttl=ttl, save_every=1)
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(image_hash, prompt):
+        return f"{image_hash:016x}|{prompt_key(prompt)}"
+
+    def get(self, image_hash, prompt):
+        answer = self.cache.get(self._key(image_hash, prompt))
+        if answer is not None:
+            with self._lock:
+                self.exact_hits += 1
+            return answer
+
+        suffix = "|" + prompt_key(prompt)
+        best_key, best_distance = None, self.threshold + 1
+        for key, _ in self.cache.items():
+            if key.endswith(suffix):
+                distance = hamming(image_hash, int(key[:16], 16))
+                if distance < best_distance:
+                    best_key, best_distance = key, distance
+
+        answer = self.cache.get(best_key) if best_key else None
+        with self._lock:
+            if answer is None:
+                self.misses += 1
+            else:
+                self.near_hits += 1
+        return answer
+
+    def set(self, image_hash, prompt, answer):
+        self.cache.set(self._key(image_hash, prompt), answer)
+
+    def stats(self):
+        lookups = self.exact_hits + self.near_hits + self.misses
+        hits = self.exact_hits + self.near_hits
+        return {
+            "entries": len(self.cache),
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
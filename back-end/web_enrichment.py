@@ -0,0 +1,144 @@
+# ==========================================
+# BELLE.AI Web Enrichment
+# Concurrent page fetch + main-text extraction for search results
+# ==========================================
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = "Mozilla/5.0 (compatible; BELLE.AI/1.0)"
+
+# Tags whose text is never part of the article body
+SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside", "form", "svg", "button"}
+BLOCK_TAGS = {"p", "h1", "h2", "h3", "li", "blockquote", "pre", "td"}
+
+# ================== SHARED HTTP SESSION ==================
+_session = None
+_session_lock = threading.Lock()
+
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="belle-fetch")
+
+
+def get_session():
+    """One pooled, keep-alive session for every page fetch."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=0)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers["User-Agent"] = USER_AGENT
+        return _session
+
+# ================== TEXT EXTRACTION ==================
+class _MainTextParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.skip_depth = 0
+        self.blocks = []
+        self.current = []
+        self.title = ""
+        self.in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == "title":
+            self.in_title = True
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == "title":
+            self.in_title = False
+        elif tag in BLOCK_TAGS:
+            self._end_block()
+
+    def handle_data(self, data):
+        if self.in_title:
+            self.title += data
+        elif not self.skip_depth:
+            self.current.append(data)
+
+    def _end_block(self):
+        text = " ".join("".join(self.current).split())
+        if text:
+            self.blocks.append(text)
+        self.current = []
+
+
+def extract_main_text(html, max_chars=1200, min_block_chars=60):
+    """Title + the longer text blocks of a page (menus and boilerplate are short)."""
+    parser = _MainTextParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    parser._end_block()
+
+    text = ""
+    for block in parser.blocks:
+        if len(block) < min_block_chars:
+            continue
+        text += block + "\n"
+        if len(text) >= max_chars:
+            break
+    return " ".join(parser.title.split()), text[:max_chars].strip()
+
+# ================== FETCHING ==================
+def fetch_page_text(url, timeout=(2, 3), max_bytes=1_500_000):
+    # streamed, so the pooled connection is only freed when the response is closed
+    with get_session().get(url, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        if "html" not in response.headers.get("Content-Type", "html"):
+            return "", ""
+
+        body = b""
+        for chunk in response.iter_content(64 * 1024):
+            body += chunk
+            if len(body) >= max_bytes:
+                break
+        encoding = response.encoding or "utf-8"
+
+    return extract_main_text(body.decode(encoding, errors="replace"))
+
+
+def start_page_fetches(urls, timeout=(2, 3)):
+    """Starts fetching every url concurrently; returns {future: url}."""
+    return {executor.submit(fetch_page_text, url, timeout): url for url in urls}
+
+
+def collect_page_texts(futures, budget, on_late_result=None):
+    """
+    {url: (title, text)} for the fetches that finish within `budget` more
+    seconds. Pages that finish later are passed to
+    on_late_result(url, (title, text)) instead of being waited for.
+    """
+    done, pending = wait(futures, timeout=max(0.0, budget))
+
+    results = {}
+    for future in done:
+        if future.exception() is None:
+            results[futures[future]] = future.result()
+
+    if on_late_result:
+        for future in pending:
+            url = futures[future]
+            future.add_done_callback(
+                lambda f, url=url: f.exception() is None and on_late_result(url, f.result())
+            )
+
+    return results
+
+
+def fetch_page_texts(urls, budget=1.5, timeout=(2, 3), on_late_result=None):
+    """Fetches every url and collects the pages that finish within `budget` seconds."""
+    return collect_page_texts(start_page_fetches(urls, timeout), budget, on_late_result)